@@ -1,8 +1,10 @@
 import logging
 
 import disnake
+from bot_base import BotContext
 from disnake.ext import commands
 
+from pyro import checks
 from pyro.bot import Pyro
 from pyro.checks import ALLOWED_HELP_CHANNELS
 
@@ -34,6 +36,17 @@ class Autohelp(commands.Cog):
 
         await self.bot.auto_help.process_message(message)
 
+    @commands.command(aliases=["ahstats"])
+    @checks.can_eval()
+    async def autohelp_stats(self, ctx: BotContext):
+        """Show how autohelp's caches are performing."""
+        await ctx.send_basic_embed(
+            "\n".join(
+                f"{name}: **{value}**"
+                for name, value in self.bot.auto_help.stats.items()
+            )
+        )
+
 
 def setup(bot):
     bot.add_cog(Autohelp(bot))
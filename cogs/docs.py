@@ -1,12 +1,24 @@
-import io
+import asyncio
+import gzip
+import json
 import os
 import re
+import sys
 import zlib
 import logging
+from bisect import bisect_left
+from typing import Dict, List, Optional
 
 import aiohttp
 import disnake
-from disnake.ext import commands
+from disnake.ext import commands, tasks
+
+from pyro.utils import FuzzyIndex
+
+# Parsed inventories are kept here between restarts
+RTFM_CACHE_PATH = os.environ.get("RTFM_CACHE_PATH", "rtfm_cache.json.gz")
+RTFM_FETCH_ATTEMPTS = 3
+RTFM_FETCH_TIMEOUT = aiohttp.ClientTimeout(total=30)
 
 
 # Sphinx reader object because d.py docs
@@ -16,32 +28,97 @@ class SphinxObjectFileReader:
     BUFSIZE = 16 * 1024
 
     def __init__(self, buffer):
-        self.stream = io.BytesIO(buffer)
+        self.buffer = buffer
+        self.view = memoryview(buffer)
+        self.position = 0
 
     def readline(self):
-        return self.stream.readline().decode("utf-8")
+        end = self.buffer.find(b"\n", self.position)
+        end = len(self.buffer) if end == -1 else end + 1
+        line = str(self.view[self.position : end], "utf-8")
+        self.position = end
+        return line
 
     def skipline(self):
-        self.stream.readline()
+        self.readline()
 
     def read_compressed_chunks(self):
         decompressor = zlib.decompressobj()
-        while True:
-            chunk = self.stream.read(self.BUFSIZE)
-            if len(chunk) == 0:
-                break
-            yield decompressor.decompress(chunk)
+        for start in range(self.position, len(self.buffer), self.BUFSIZE):
+            yield decompressor.decompress(self.view[start : start + self.BUFSIZE])
         yield decompressor.flush()
 
     def read_compressed_lines(self):
-        buf = b""
+        pending = bytearray()
         for chunk in self.read_compressed_chunks():
-            buf += chunk
-            pos = buf.find(b"\n")
-            while pos != -1:
-                yield buf[:pos].decode("utf-8")
-                buf = buf[pos + 1 :]
-                pos = buf.find(b"\n")
+            pending += chunk
+            end = pending.rfind(b"\n")
+            if end == -1:
+                continue
+
+            # Decode every complete line at once, keeping
+            # the partial last line for the next chunk
+            with memoryview(pending) as view:
+                lines = str(view[:end], "utf-8")
+            del pending[: end + 1]
+            yield from lines.split("\n")
+
+        if pending:
+            yield pending.decode("utf-8")
+
+
+class Inventory:
+    """A parsed objects.inv, stored as lists sorted by name.
+
+    Most locations are shared templates ending in ``$``, which
+    stands in for the entries anchor, so full urls are only
+    built for the entries which are actually looked up.
+    """
+
+    __slots__ = ("url", "names", "locations", "anchors")
+
+    def __init__(
+        self,
+        url: str,
+        names: List[str],
+        locations: List[str],
+        anchors: List[Optional[str]],
+    ):
+        self.url: str = url
+        self.names: List[str] = names
+        self.locations: List[str] = locations
+        self.anchors: List[Optional[str]] = anchors
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+    def get(self, name: str) -> Optional[str]:
+        """Get the url for the given name."""
+        i = bisect_left(self.names, name)
+        if i == len(self.names) or self.names[i] != name:
+            return None
+
+        location = self.locations[i]
+        if self.anchors[i] is not None:
+            location = location[:-1] + self.anchors[i]
+
+        return os.path.join(self.url, location)
+
+    def to_dict(self) -> Dict[str, list]:
+        return {
+            "names": self.names,
+            "locations": self.locations,
+            "anchors": self.anchors,
+        }
+
+    @classmethod
+    def from_dict(cls, url: str, data: Dict[str, list]) -> "Inventory":
+        return cls(
+            url,
+            data["names"],
+            [sys.intern(location) for location in data["locations"]],
+            data["anchors"],
+        )
 
 
 class Docs(commands.Cog, name="Documentation"):
@@ -59,30 +136,104 @@ class Docs(commands.Cog, name="Documentation"):
             "python": "https://docs.python.org/3",
         }
 
-    def finder(self, text, collection, *, key=None, lazy=True):
-        suggestions = []
-        text = str(text)
-        pat = ".*?".join(map(re.escape, text))
-        regex = re.compile(pat, flags=re.IGNORECASE)
-        for item in collection:
-            to_search = key(item) if key else item
-            r = regex.search(to_search)
-            if r:
-                suggestions.append((len(r.group()), r.start(), item))
-
-        def sort_key(tup):
-            if key:
-                return tup[0], tup[1], key(tup[2])
-            return tup
-
-        if lazy:
-            return (z for _, _, z in sorted(suggestions, key=sort_key))
-        else:
-            return [z for _, _, z in sorted(suggestions, key=sort_key)]
+        self._rtfm_cache: Dict[str, Inventory] = {}
+        # The ETag and Last-Modified headers each inventory was served with
+        self._rtfm_validators: Dict[str, Dict[str, str]] = {}
+        self._rtfm_index: Dict[str, FuzzyIndex] = {}
+        self._rtfm_ready: asyncio.Event = asyncio.Event()
+        self.refresh_rtfm.start()
+
+    def cog_unload(self) -> None:
+        self.refresh_rtfm.cancel()
+
+    @tasks.loop(hours=12)
+    async def refresh_rtfm(self):
+        try:
+            if not self._rtfm_cache:
+                await asyncio.to_thread(self.load_rtfm_cache)
+
+            await self.build_rtfm_lookup_table(self.page_types)
+            await asyncio.to_thread(self.save_rtfm_cache)
+        except Exception as e:
+            self.logger.error("Failed to refresh the rtfm lookup table: %s", e)
+        finally:
+            self._rtfm_ready.set()
+
+    @refresh_rtfm.before_loop
+    async def before_refresh_rtfm(self):
+        # Cogs are loaded before the bot's session exists
+        await self.bot.wait_until_ready()
+
+    def load_rtfm_cache(self) -> None:
+        try:
+            with gzip.open(RTFM_CACHE_PATH, "rt", encoding="utf-8") as file:
+                data = json.load(file)
+        except FileNotFoundError:
+            return
+        except (OSError, ValueError) as e:
+            self.logger.warning("Ignoring unreadable rtfm cache: %s", e)
+            return
+
+        pages = {}
+        for key, inventory in data.items():
+            if self.page_types.get(key) != inventory["url"]:
+                # This page has moved since it was cached
+                continue
+
+            # Share inventories between keys for the same page so they're only indexed once
+            if inventory["url"] not in pages:
+                try:
+                    pages[inventory["url"]] = Inventory.from_dict(
+                        inventory["url"], inventory
+                    )
+                except KeyError:
+                    # Cached in an older format
+                    continue
+
+            self._rtfm_cache[key] = pages[inventory["url"]]
+            self._rtfm_validators[key] = inventory["validators"]
+
+        self._rtfm_index = self.index_rtfm_cache(self._rtfm_cache)
+        self.logger.info("Loaded %s rtfm inventories from disk", len(self._rtfm_cache))
+
+    def save_rtfm_cache(self) -> None:
+        data = {
+            key: {
+                "url": self.page_types[key],
+                "validators": self._rtfm_validators.get(key, {}),
+                **inventory.to_dict(),
+            }
+            for key, inventory in self._rtfm_cache.items()
+        }
+
+        # Write then move so a crash never leaves a half written cache
+        temp_path = f"{RTFM_CACHE_PATH}.tmp"
+        with gzip.open(temp_path, "wt", encoding="utf-8") as file:
+            json.dump(data, file, separators=(",", ":"))
+        os.replace(temp_path, RTFM_CACHE_PATH)
+
+    def index_rtfm_cache(self, cache) -> Dict[str, FuzzyIndex]:
+        """Index each inventory for searching, reusing the
+        indexes of inventories which haven't changed."""
+        indexes = {}
+        built = {}
+        for key, inventory in cache.items():
+            if self._rtfm_cache.get(key) is inventory and key in self._rtfm_index:
+                indexes[key] = self._rtfm_index[key]
+                continue
+
+            if id(inventory) not in built:
+                built[id(inventory)] = FuzzyIndex(inventory.names)
+            indexes[key] = built[id(inventory)]
+
+        return indexes
 
     def parse_object_inv(self, stream, url):
-        # key: URL
-        result = {}
+        # key: position in the lists below
+        positions: Dict[str, int] = {}
+        names: List[str] = []
+        locations: List[str] = []
+        anchors: List[Optional[str]] = []
 
         # first line is version info
         inv_version = stream.readline().rstrip()
@@ -92,24 +243,37 @@ class Docs(commands.Cog, name="Documentation"):
 
         # next line is "# Project: <name>"
         # then after that is "# Version: <version>"
-        stream.readline().rstrip()[11:]
-        stream.readline().rstrip()[11:]
+        stream.skipline()
+        stream.skipline()
 
         # next line says if it's a zlib header
         line = stream.readline()
         if "zlib" not in line:
             raise RuntimeError("Invalid objects.inv file, not z-lib compatible.")
 
+        # The key prefix for each directive, there are only a few dozen of them
+        prefixes: Dict[str, str] = {}
+
         # This code mostly comes from the Sphinx repository.
         entry_regex = re.compile(r"(?x)(.+?)\s+(\S*:\S*)\s+(-?\d+)\s+(\S+)\s+(.*)")
         for line in stream.read_compressed_lines():
-            match = entry_regex.match(line.rstrip())
-            if not match:
-                continue
-
-            name, directive, prio, location, dispname = match.groups()
-            domain, _, subdirective = directive.partition(":")
-            if directive == "py:module" and name in result:
+            # Only names containing whitespace need the regex
+            parts = line.rstrip().split(None, 4)
+            if (
+                len(parts) == 5
+                and not line[0].isspace()
+                and ":" in parts[1]
+                and parts[2].removeprefix("-").isdecimal()
+            ):
+                name, directive, _, location, dispname = parts
+            else:
+                match = entry_regex.match(line.rstrip())
+                if not match:
+                    continue
+
+                name, directive, _, location, dispname = match.groups()
+
+            if directive == "py:module" and name in positions:
                 # From the Sphinx Repository:
                 # due to a bug in 1.1 and below,
                 # two inventory entries are created
@@ -117,34 +281,135 @@ class Docs(commands.Cog, name="Documentation"):
                 # one is correct
                 continue
 
-            # Most documentation pages have a label
-            if directive == "std:doc":
-                subdirective = "label"
+            prefix = prefixes.get(directive)
+            if prefix is None:
+                domain, _, subdirective = directive.partition(":")
+                # Most documentation pages have a label
+                if directive == "std:doc":
+                    subdirective = "label"
+
+                prefix = f"{subdirective}:" if domain == "std" else ""
+                prefixes[directive] = sys.intern(prefix)
 
+            anchor = None
             if location.endswith("$"):
-                location = location[:-1] + name
+                # These are shared by every entry on the same page
+                location = sys.intern(location)
+                anchor = name
 
             key = name if dispname == "-" else dispname
-            prefix = f"{subdirective}:" if domain == "std" else ""
+            key = f"{prefix}{key}" if prefix else key
+
+            position = positions.get(key)
+            if position is None:
+                positions[key] = len(names)
+                names.append(key)
+                locations.append(location)
+                anchors.append(anchor)
+            else:
+                locations[position] = location
+                anchors[position] = anchor
+
+        order = sorted(range(len(names)), key=names.__getitem__)
+        return Inventory(
+            url,
+            [names[i] for i in order],
+            [locations[i] for i in order],
+            [anchors[i] for i in order],
+        )
+
+    async def fetch_rtfm_inventory(self, key, page):
+        """Fetch and parse a single inventory, retrying transient failures.
+
+        Returns
+        -------
+        Optional[Tuple[Inventory, Dict[str, str]]]
+            The inventory and validators for this page,
+            or ``None`` if it is unchanged since we last parsed it.
+        """
+        # Only download inventories which changed since we last parsed them
+        headers = {}
+        if key in self._rtfm_cache:
+            known = self._rtfm_validators.get(key, {})
+            if "etag" in known:
+                headers["If-None-Match"] = known["etag"]
+            if "last_modified" in known:
+                headers["If-Modified-Since"] = known["last_modified"]
+
+        for attempt in range(1, RTFM_FETCH_ATTEMPTS + 1):
+            try:
+                async with self.bot.session.get(
+                    page + "/objects.inv", headers=headers, timeout=RTFM_FETCH_TIMEOUT
+                ) as resp:
+                    if resp.status == 304:
+                        return None
+
+                    if resp.status == 200:
+                        stream = SphinxObjectFileReader(await resp.read())
+                        inventory = await asyncio.to_thread(
+                            self.parse_object_inv, stream, page
+                        )
+                        validators = {
+                            name: resp.headers[header]
+                            for name, header in (
+                                ("etag", "ETag"),
+                                ("last_modified", "Last-Modified"),
+                            )
+                            if header in resp.headers
+                        }
+                        return inventory, validators
+
+                    if resp.status < 500 and resp.status != 429:
+                        # Retrying won't fix a missing page
+                        raise RuntimeError(f"{page} returned {resp.status}")
+
+                    error = RuntimeError(f"{page} returned {resp.status}")
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                error = e
 
-            result[f"{prefix}{key}"] = os.path.join(url, location)
+            if attempt < RTFM_FETCH_ATTEMPTS:
+                await asyncio.sleep(2**attempt)
 
-        return result
+        raise error
 
     async def build_rtfm_lookup_table(self, page_types):
-        cache = {}
+        # Some keys are aliases for the same page, so only fetch each page once
+        pages: Dict[str, list] = {}
         for key, page in page_types.items():
-            async with aiohttp.ClientSession() as session:
-                async with session.get(page + "/objects.inv") as resp:
-                    if resp.status != 200:
-                        raise RuntimeError(
-                            "Cannot build rtfm lookup table, try again later."
-                        )
+            pages.setdefault(page, []).append(key)
+
+        results = await asyncio.gather(
+            *(self.fetch_rtfm_inventory(keys[0], page) for page, keys in pages.items()),
+            return_exceptions=True,
+        )
+
+        cache = {}
+        validators = {}
+        for (page, keys), result in zip(pages.items(), results):
+            for key in keys:
+                if isinstance(result, BaseException):
+                    # A single broken site only costs us that sites docs,
+                    # and even then we keep serving whatever we had before
+                    self.logger.warning(
+                        "Failed to refresh the rtfm inventory for %s: %s", key, result
+                    )
+                    if key not in self._rtfm_cache:
+                        continue
+
+                    result = None
+
+                if result is None:
+                    cache[key] = self._rtfm_cache[key]
+                    validators[key] = self._rtfm_validators.get(key, {})
+                else:
+                    cache[key], validators[key] = result
 
-                    stream = SphinxObjectFileReader(await resp.read())
-                    cache[key] = self.parse_object_inv(stream, page)
+        # Indexing large inventories takes a while
+        indexes = await asyncio.to_thread(self.index_rtfm_cache, cache)
 
         self._rtfm_cache = cache
+        self._rtfm_validators = validators
+        self._rtfm_index = indexes
 
     async def do_rtfm(self, ctx, key, obj):
         page_types = self.page_types
@@ -153,13 +418,21 @@ class Docs(commands.Cog, name="Documentation"):
             await ctx.send(page_types[key])
             return
 
-        if not hasattr(self, "_rtfm_cache"):
+        if key not in self._rtfm_index:
+            # Only the very first start up has nothing
+            # loaded from disk, so wait on the first refresh
             await ctx.trigger_typing()
-            await self.build_rtfm_lookup_table(page_types)
+            await self._rtfm_ready.wait()
 
-        cache = list(self._rtfm_cache[key].items())
+        if key not in self._rtfm_index:
+            return await ctx.send(
+                "I couldn't load those docs right now, try again later."
+            )
 
-        self.matches = self.finder(obj, cache, key=lambda t: t[0], lazy=False)[:8]
+        inventory = self._rtfm_cache[key]
+        self.matches = [
+            (name, inventory.get(name)) for name in self._rtfm_index[key].search(obj)
+        ]
 
         e = disnake.Embed(
             colour=0xCE2029,
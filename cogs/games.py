@@ -1,96 +1,194 @@
 import asyncio
-import dataclasses
+import datetime
 import logging
+import os
 import random
-from itertools import islice
 from string import Template
+from typing import Dict, List, Optional, Tuple
 
 import disnake
-from alaric import AQ
-from alaric.comparison import EQ
+import pymongo
+from bot_base.exceptions import NonExistentEntry
 from bot_base.paginators.disnake_paginator import DisnakePaginator
 from disnake.ext import commands
+from pymongo import ReturnDocument
 
-from pyro.utils import Winner, TicTacToe, InvalidMove, PlayerStats
+from pyro.utils import (
+    Winner,
+    TicTacToe,
+    InvalidMove,
+    PlayerStats,
+    Leaderboard,
+    LRUCache,
+    GameSession,
+    GameSessions,
+)
+
+STAT_TYPES = ("wins", "losses", "draws")
+
+# Fetch stats as they are needed rather than loading every player on startup
+LAZY_STATS = bool(os.environ.get("TICTACTOE_LAZY_STATS", False))
 
 
 class Games(commands.Cog):
     def __init__(self, bot):
         self.bot = bot
-        self.stats = {}
         self.logger = logging.getLogger(__name__)
+        self.lazy_stats: bool = LAZY_STATS
+
+        # Every player, only used when stats aren't lazy
+        self.stats = {}
+        self.leaderboards: Dict[str, Leaderboard] = {
+            stat_type: Leaderboard() for stat_type in STAT_TYPES
+        }
+
+        # Recently seen players, only used when stats are lazy. Players
+        # without stats are cached as None so they aren't refetched
+        self._cached_stats: LRUCache = LRUCache(
+            1024, ttl=datetime.timedelta(minutes=10)
+        )
+
+        self.sessions: GameSessions = GameSessions()
+
+    @staticmethod
+    def to_player_stats(document) -> PlayerStats:
+        return PlayerStats(
+            document["_id"],
+            wins=document.get("wins", 0),
+            losses=document.get("losses", 0),
+            draws=document.get("draws", 0),
+        )
+
+    async def get_stats(self, player_id: int) -> Optional[PlayerStats]:
+        if not self.lazy_stats:
+            return self.stats.get(player_id)
 
-    async def chunk_results(self, it, size):
-        it = iter(it)
-        return iter(lambda: tuple(islice(it, size)), ())
-
-    async def display_board(self, messageable, game, *, content=None):
-        board = game.board
-        desc = f"""
-        ```yaml
-          1|2|3
-        1|{board[0][0].to_piece()}|{board[0][1].to_piece()}|{board[0][2].to_piece()}
-        2|{board[1][0].to_piece()}|{board[1][1].to_piece()}|{board[1][2].to_piece()}
-        3|{board[2][0].to_piece()}|{board[2][1].to_piece()}|{board[2][2].to_piece()}
-        ```
+        try:
+            return self._cached_stats.get_entry(player_id)
+        except NonExistentEntry:
+            pass
+
+        document = await self.bot.db.tictactoe.raw_collection.find_one(
+            {"_id": player_id}
+        )
+        player = self.to_player_stats(document) if document else None
+        self._cached_stats.add_entry(player_id, player, override=True)
+        return player
+
+    async def get_rank(self, stat_type: str, player: PlayerStats) -> Optional[int]:
+        """Get a player's rank for a stat, where
+        players on the same stat share a rank."""
+        if not self.lazy_stats:
+            return self.leaderboards[stat_type].rank(player.player_id)
+
+        value = getattr(player, stat_type)
+        if not value:
+            return None
+
+        above = await self.bot.db.tictactoe.raw_collection.count_documents(
+            {stat_type: {"$gt": value}}
+        )
+        return above + 1
+
+    async def get_leaderboard_size(self, stat_type: str) -> int:
+        if not self.lazy_stats:
+            return len(self.leaderboards[stat_type])
+
+        return await self.bot.db.tictactoe.raw_collection.count_documents(
+            {stat_type: {"$gt": 0}}
+        )
+
+    async def get_leaderboard_page(
+        self, stat_type: str, start: int, size: int
+    ) -> List[Tuple[int, int]]:
+        """Get the player ids and stats of the
+        players from position start onwards.
+
+        Notes
+        -----
+        Lazily fetched leaderboards break ties by
+        player id rather than who got there first.
         """
+        if not self.lazy_stats:
+            return self.leaderboards[stat_type].page(start, size)
 
-        embed = disnake.Embed(
-            title=f"TicTacToe ({game.player_one.display_name} VS {game.player_two.display_name})",
-            description=desc,
+        cursor = (
+            self.bot.db.tictactoe.raw_collection.find(
+                {stat_type: {"$gt": 0}}, {stat_type: 1}
+            )
+            .sort([(stat_type, pymongo.DESCENDING), ("_id", pymongo.ASCENDING)])
+            .skip(start)
+            .limit(size)
         )
-        await messageable.edit(content=content, embed=embed)
+        return [(document["_id"], document[stat_type]) async for document in cursor]
 
     async def update_stats(self, member, end_state, was_player_one):
-        player = self.stats.get(member.id, PlayerStats(member.id))
-
+        stat_type = None
         if end_state.value == 1:
-            if was_player_one:
-                player.wins += 1
-            else:
-                player.losses += 1
+            stat_type = "wins" if was_player_one else "losses"
 
         elif end_state.value == 2:
-            if was_player_one:
-                player.losses += 1
-            else:
-                player.wins += 1
+            stat_type = "losses" if was_player_one else "wins"
 
         elif end_state.value == 3:
-            player.draws += 1
+            stat_type = "draws"
+
+        increments = dict.fromkeys(STAT_TYPES, 0)
+        if stat_type:
+            increments[stat_type] = 1
+
+        # Incrementing every stat creates any missing ones as 0
+        document = await self.bot.db.tictactoe.raw_collection.find_one_and_update(
+            {"_id": member.id},
+            {"$inc": increments},
+            upsert=True,
+            return_document=ReturnDocument.AFTER,
+        )
+        player = self.to_player_stats(document)
 
-        self.stats[member.id] = player
+        if self.lazy_stats:
+            self._cached_stats.add_entry(member.id, player, override=True)
+            return
 
-        data = dataclasses.asdict(player)
-        data["_id"] = data.pop("player_id")
-        await self.bot.db.tictactoe.upsert(AQ(EQ("_id", data["_id"])), data)
+        self.stats[member.id] = player
+        if stat_type:
+            self.leaderboards[stat_type].set(member.id, getattr(player, stat_type))
 
     async def populate_stats(self):
+        if self.lazy_stats:
+            # Leaderboards are sorted by Mongo instead
+            for stat_type in STAT_TYPES:
+                await self.bot.db.tictactoe.raw_collection.create_index(
+                    [(stat_type, pymongo.DESCENDING), ("_id", pymongo.ASCENDING)]
+                )
+
+            return
+
         # Handle on_ready being called multiple times
         if self.stats:
             return
 
         data = await self.bot.db.tictactoe.get_all()
         for document in data:
-            player = PlayerStats(
-                document["_id"],
-                wins=document["wins"],
-                losses=document["losses"],
-                draws=document["draws"],
-            )
+            player = self.to_player_stats(document)
             self.stats[document["_id"]] = player
 
+            for stat_type in STAT_TYPES:
+                self.leaderboards[stat_type].set(
+                    player.player_id, getattr(player, stat_type)
+                )
+
     @commands.Cog.listener()
     async def on_ready(self):
         self.logger.info("I'm ready!")
         await self.populate_stats()
 
+    @commands.Cog.listener()
+    async def on_message(self, message: disnake.Message):
+        self.sessions.dispatch(message)
+
     @commands.command(aliases=["ttt"])
-    @commands.max_concurrency(1, commands.BucketType.channel)
     async def tictactoe(self, ctx, player_two: disnake.Member = None):
-        def check(m):
-            return m.channel == ctx.channel and m.author == current_player
-
         def react_check(payload):
             return (
                 payload.message_id == difficulty_message.id
@@ -105,32 +203,6 @@ class Games(commands.Cog):
             player_two = ctx.guild.me
             is_bot = True
 
-            embed = disnake.Embed(
-                title="Please pick a difficulty",
-                description=":one: - Easy\n:two: - Hard",
-            )
-
-            difficulty_message = await ctx.send(embed=embed)
-            await difficulty_message.add_reaction("1️⃣")
-            await difficulty_message.add_reaction("2⃣")
-
-            try:
-                payload = await self.bot.wait_for(
-                    "raw_reaction_add", check=react_check, timeout=25
-                )
-            except asyncio.TimeoutError:
-                await ctx.send("I picked hard on your behalf :)")
-            else:
-                if str(payload.emoji) == "1️⃣":
-                    difficulty = 2.5
-                    await ctx.send("Set difficulty to easy", delete_after=10)
-                else:
-                    await ctx.send("Set difficulty to hard", delete_after=10)
-            finally:
-                await difficulty_message.delete()
-
-        m = await ctx.send("Starting game!")
-
         game = TicTacToe(
             player_one=ctx.author,
             player_two=player_two,
@@ -138,35 +210,76 @@ class Games(commands.Cog):
             difficulty=difficulty,
         )
 
-        player_one_start = random.choice([True, False])
-        if not player_one_start:
-            await game.flip_player()
+        # Moves are routed by player, so each player can only be in one game.
+        # The game is started before anything is awaited so that
+        # two games can't both start with the same player
+        session = GameSession(game, ctx.channel)
+        if busy_player := self.sessions.start(session):
+            return await ctx.send(
+                f"`{busy_player.display_name}` is already playing a game!"
+            )
+
+        try:
+            if is_bot:
+                embed = disnake.Embed(
+                    title="Please pick a difficulty",
+                    description=":one: - Easy\n:two: - Hard",
+                )
+
+                difficulty_message = await ctx.send(embed=embed)
+                await difficulty_message.add_reaction("1️⃣")
+                await difficulty_message.add_reaction("2⃣")
+
+                try:
+                    payload = await self.bot.wait_for(
+                        "raw_reaction_add", check=react_check, timeout=25
+                    )
+                except asyncio.TimeoutError:
+                    await ctx.send("I picked hard on your behalf :)")
+                else:
+                    if str(payload.emoji) == "1️⃣":
+                        game.difficulty = 2.5
+                        await ctx.send("Set difficulty to easy", delete_after=10)
+                    else:
+                        await ctx.send("Set difficulty to hard", delete_after=10)
+                finally:
+                    await difficulty_message.delete()
+
+            player_one_start = random.choice([True, False])
+            if not player_one_start:
+                await game.flip_player()
+
+            winner = await self.play(session)
+        finally:
+            self.sessions.end(session)
+
+        await self.update_stats(ctx.author, winner, True)
+        await self.update_stats(player_two, winner, False)
 
-        await self.display_board(m, game)
+    async def play(self, session: GameSession) -> Winner:
+        """Play a game through to the end, returning who won.
 
+        The board is only shown once per move,
+        as the bot's moves are shown alongside the next prompt.
+        """
+        game = session.game
         while (winner := await game.is_over()) == Winner.NO_WINNER:
-            current_player = ctx.author if game.is_player_one_move else player_two
+            current_player = session.current_player
 
-            if not game.is_player_one_move and is_bot:
-                await self.display_board(
-                    m,
-                    game,
-                    content=f"{current_player.mention}, please pick where you wish to play in the format `row column`",
-                )
+            if not game.is_player_one_move and game.is_agaisnt_computer:
                 await game.ai_turn()
-                await asyncio.sleep(random.randrange(0, 5))
                 continue
 
             try:
-                await self.display_board(
-                    m,
-                    game,
-                    content=f"{current_player.mention}, please pick where you wish to play in the format `row column`",
+                await session.show(
+                    f"{current_player.mention}, please pick where you wish to play in the format `row column`"
                 )
-                msg = await self.bot.wait_for("message", check=check, timeout=25)
+                msg = await self.sessions.wait_for_move(session, timeout=25)
             except asyncio.TimeoutError:
                 await game.flip_player()
-                await ctx.send(f"{current_player.mention}, you missed your turn!")
+                await session.channel.send(
+                    f"{current_player.mention}, you missed your turn!"
+                )
             else:
                 content = msg.content
 
@@ -176,7 +289,7 @@ class Games(commands.Cog):
                     pass
 
                 if not len(content) == 3:
-                    await ctx.send(
+                    await session.channel.send(
                         f"{current_player.mention}, Invalid move sequence, please see the format and try again",
                         delete_after=10,
                     )
@@ -186,32 +299,42 @@ class Games(commands.Cog):
                 try:
                     await game.make_move(row, column)
                 except InvalidMove:
-                    await ctx.send(
+                    await session.channel.send(
                         f"{current_player.mention}, illegal move sequence, please try again",
                         delete_after=10,
                     )
                     continue
 
         content = Template(str(winner)).safe_substitute(
-            {"MENTIONONE": ctx.author.mention, "MENTIONTWO": player_two.mention}
+            {
+                "MENTIONONE": game.player_one.mention,
+                "MENTIONTWO": game.player_two.mention,
+            }
         )
-        await self.display_board(m, game, content=content)
-
-        await self.update_stats(ctx.author, winner, True)
-        await self.update_stats(player_two, winner, False)
+        await session.show(content)
+        return winner
 
     @commands.command()
     async def stats(self, ctx, player: disnake.Member = None):
         """Returns your TicTacToe stats"""
         player = player or ctx.author
-        if not (player_stats := self.stats.get(player.id)):
+        if not (player_stats := await self.get_stats(player.id)):
             return await ctx.send(f"I have no stats for `{player.display_name}`")
 
+        description = ""
+        for stat_type in STAT_TYPES:
+            description += (
+                f"{stat_type.title()}: **{getattr(player_stats, stat_type)}**"
+            )
+            rank = await self.get_rank(stat_type, player_stats)
+            if rank:
+                description += f" (#{rank})"
+
+            description += "\n"
+
         embed = disnake.Embed(
             title=f"TicTacToe stats for: `{player.display_name}`",
-            description=f"Wins: **{player_stats.wins}**\n"
-            f"Losses: **{player_stats.losses}**\n"
-            f"Draws: **{player_stats.draws}**",
+            description=description,
             timestamp=ctx.message.created_at,
         )
         await ctx.send(embed=embed)
@@ -219,31 +342,24 @@ class Games(commands.Cog):
     @commands.command(aliases=["lb"])
     async def leaderboard(self, ctx, stat_type="wins"):
         """Shows the TicTacToe leaderboard"""
-        if (stat_type := stat_type.lower()) not in ["wins", "losses", "draws"]:
+        if (stat_type := stat_type.lower()) not in STAT_TYPES:
             return await ctx.send("Invalid stat type requested!")
 
-        data = list(self.stats.values())
-        if not data:
+        # Players on 0 aren't on the leaderboard
+        size = await self.get_leaderboard_size(stat_type)
+        if not size:
             return await ctx.send("I have no stats to show.")
 
-        data = sorted(data, key=lambda x: getattr(x, stat_type), reverse=True)
-        data = await self.chunk_results(data, 10)
+        # Pages are fetched as they are shown
+        pages = list(range(0, size, 10))
 
-        pages = []
-        for item in data:
+        async def format_page(start, page_number):
             page = ""
+            for player_id, count in await self.get_leaderboard_page(
+                stat_type, start, 10
+            ):
+                page += f"<@{player_id}> - {count} {stat_type}\n"
 
-            for result in item:
-                count = getattr(result, stat_type)
-                if not count:
-                    continue
-
-                page += f"<@{result.player_id}> - {count} {stat_type}\n"
-
-            if page:
-                pages.append(page)
-
-        async def format_page(page, page_number):
             embed = disnake.Embed(title=f"TicTacToe leaderboard for `{stat_type}`")
             embed.description = page
 
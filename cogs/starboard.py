@@ -1,29 +1,157 @@
+import asyncio
+import datetime
+import functools
 import logging
+from typing import Dict, Set
 
 import disnake
+from bot_base import BotContext
+from bot_base.exceptions import NonExistentEntry
 from disnake.ext import commands
 
+from pyro import checks
+from pyro.utils import EditCoalescer, LRUCache
+
+
+class StarCount:
+    """Who has starred a message, not counting its author.
+
+    Parameters
+    ----------
+    emoji: str
+        The starboard emoji being counted.
+    author_id: int
+        The message author, whose own star never counts.
+    users: Set[int]
+        Everyone else who has starred the message.
+    """
+
+    __slots__ = ("emoji", "author_id", "users")
+
+    def __init__(self, emoji: str, author_id: int, users: Set[int]):
+        self.emoji: str = emoji
+        self.author_id: int = author_id
+        self.users: Set[int] = users
+        self.users.discard(author_id)
+
+    def __len__(self) -> int:
+        return len(self.users)
+
+    def add(self, user_id: int) -> None:
+        if user_id != self.author_id:
+            self.users.add(user_id)
+
+    def remove(self, user_id: int) -> None:
+        self.users.discard(user_id)
+
 
 class Starboard(commands.Cog, name="Starboard"):
     def __init__(self, bot):
         self.bot = bot
         self.logger = logging.getLogger(__name__)
 
+        # Keyed by message id. Counts are kept up to date from reaction
+        # events, expiring now and then so that any drift gets reconciled
+        self._star_counts: LRUCache = LRUCache(1024, ttl=datetime.timedelta(hours=1))
+        self._reconciling: Dict[int, asyncio.Task] = {}
+
+        # Bursts of stars only edit the starboard message once
+        self._edits: EditCoalescer = EditCoalescer(delay=2.0)
+
+    def cog_unload(self) -> None:
+        self._edits.close()
+
     @commands.Cog.listener()
     async def on_ready(self):
+        # Reaction events may have been missed while we were disconnected
+        self._star_counts = LRUCache(1024, ttl=datetime.timedelta(hours=1))
+        await self.bot.db.starred_messages.load()
         self.logger.info("I'm ready!")
 
+    async def get_star_count(
+        self, channel: disnake.abc.Messageable, message_id: int, emoji: str
+    ) -> StarCount:
+        """Get who has starred a message, only fetching
+        the reactions if we aren't already counting them.
+
+        Raises
+        ------
+        disnake.HTTPException
+            Fetching the message failed
+        """
+        try:
+            stars: StarCount = self._star_counts.get_entry(message_id)
+        except NonExistentEntry:
+            pass
+        else:
+            if stars.emoji == emoji:
+                return stars
+
+        # Events arriving mid fetch share it, then apply themselves on top.
+        # Adding or removing a user already reflected in the fetch is a no-op
+        task = self._reconciling.get(message_id)
+        if task is None:
+            task = asyncio.create_task(
+                self._fetch_star_count(channel, message_id, emoji)
+            )
+            self._reconciling[message_id] = task
+            task.add_done_callback(lambda _: self._reconciling.pop(message_id, None))
+
+        return await task
+
+    async def _fetch_star_count(
+        self, channel: disnake.abc.Messageable, message_id: int, emoji: str
+    ) -> StarCount:
+        msg = await channel.fetch_message(message_id)
+        reaction = disnake.utils.find(lambda r: str(r.emoji) == emoji, msg.reactions)
+        users = set()
+        if reaction:
+            users = {user.id for user in await reaction.users().flatten()}
+
+        stars = StarCount(emoji, msg.author.id, users)
+        self._star_counts.add_entry(message_id, stars, override=True)
+        return stars
+
+    def edit_star_count(
+        self, starboard: disnake.TextChannel, message_id: int, content: str
+    ) -> None:
+        """Update the star count shown on a starboard message."""
+        self._edits.edit(
+            message_id,
+            functools.partial(starboard.fetch_message, message_id),
+            content=content,
+        )
+
+    @commands.command(aliases=["sbstats"])
+    @checks.can_eval()
+    async def starboard_stats(self, ctx: BotContext):
+        """Show how many starboard edits have been coalesced."""
+        await ctx.send_basic_embed(
+            f"Starboard edits: **{self._edits.edits}**\n"
+            f"Starboard edits saved: **{self._edits.edits_saved}**\n"
+            f"Star counts cached: **{len(self._star_counts)}**"
+        )
+
+    @commands.Cog.listener()
+    async def on_raw_reaction_clear(self, payload):
+        self._star_counts.delete_entry(payload.message_id)
+
+    @commands.Cog.listener()
+    async def on_raw_reaction_clear_emoji(self, payload):
+        self._star_counts.delete_entry(payload.message_id)
+
+    @commands.Cog.listener()
+    async def on_raw_message_delete(self, payload):
+        self._star_counts.delete_entry(payload.message_id)
+
     @commands.Cog.listener()
     async def on_raw_reaction_add(self, payload):
         if not payload.guild_id:
             # Only use this in guilds
             return
 
-        entries = await self.bot.db.config.get_all()
-        guilds = list(map(lambda e: e["_id"], entries))
-        if payload.guild_id in guilds:
-            guild = list(filter(lambda e: e["_id"] == payload.guild_id, entries))
-            guild = guild[0]
+        guild = await self.bot.db.guild_configs.get(payload.guild_id)
+        if guild:
             emoji = guild.get("emoji") or "⭐"
 
             if not guild.get("starboard_channel"):
@@ -37,46 +165,37 @@ class Starboard(commands.Cog, name="Starboard"):
             if str(payload.emoji) == emoji:
                 channel = self.bot.get_channel(payload.channel_id)
                 try:
-                    msg = await channel.fetch_message(payload.message_id)
-                    reacts = msg.reactions
-                    reacts = list(filter(lambda r: str(r.emoji) == emoji, reacts))
+                    stars = await self.get_star_count(
+                        channel, payload.message_id, emoji
+                    )
                 except disnake.HTTPException:
                     return await channel.send(
                         "An error occurred while fetching the message"
                     )
 
-                if reacts:
-                    react = list(map(lambda u: u.id, await reacts[0].users().flatten()))
-                    if msg.author.id in react:
-                        del react[react.index(msg.author.id)]
-
+                stars.add(payload.user_id)
+                if stars:
                     thresh = guild.get("emoji_threshold") or 3
-                    if len(react) >= thresh:
+                    if len(stars) >= thresh:
                         # We should now be 'adding' this to our starboard
                         # So lets just check its not already in it haha
                         # and if it is, update the message rather then make a new one
                         starboard = self.bot.get_channel(guild["starboard_channel"])
 
-                        existing_star = await self.bot.db.starboard.find(
-                            {
-                                "_id": payload.message_id,
-                                "guildId": payload.guild_id,
-                                "channelId": payload.channel_id,
-                            }
+                        starred = await self.bot.db.starred_messages.get(
+                            payload.guild_id
                         )
 
-                        if existing_star:
+                        if payload.message_id in starred:
                             # This message is already in the starboard, update the star count
-                            if not existing_star.get("starboard_message_id"):
+                            if not starred[payload.message_id]:
                                 # Guard against old starboard items
                                 return
 
-                            existing_message = await starboard.fetch_message(
-                                existing_star["starboard_message_id"]
-                            )
-                            await existing_message.edit(
-                                content=f"{len(react)} {emoji} | {channel.mention}",
-                                embed=existing_message.embeds[0],
+                            self.edit_star_count(
+                                starboard,
+                                starred[payload.message_id],
+                                f"{len(stars)} {emoji} | {channel.mention}",
                             )
                             return
 
@@ -84,6 +203,13 @@ class Starboard(commands.Cog, name="Starboard"):
                             # Don't allow starboarding starboards, #37
                             return
 
+                        try:
+                            msg = await channel.fetch_message(payload.message_id)
+                        except disnake.HTTPException:
+                            return await channel.send(
+                                "An error occurred while fetching the message"
+                            )
+
                         embed = disnake.Embed(
                             description=msg.content,
                             color=msg.author.color,
@@ -118,21 +244,18 @@ class Starboard(commands.Cog, name="Starboard"):
                                 embed.set_image(url=image)
 
                         starboard_message = await starboard.send(
-                            content=f"{len(react)} {emoji} | {channel.mention}",
+                            content=f"{len(stars)} {emoji} | {channel.mention}",
                             embed=embed,
                         )
                         if msg_embed and not msg_embed.image.url:
                             await starboard.send(embed=msg_embed)
 
-                        await self.bot.db.starboard.upsert(
-                            {"_id": payload.message_id},
-                            {
-                                "_id": payload.message_id,
-                                "guildId": payload.guild_id,
-                                "authorId": payload.user_id,
-                                "channelId": payload.channel_id,
-                                "starboard_message_id": starboard_message.id,
-                            },
+                        await self.bot.db.starred_messages.add(
+                            payload.guild_id,
+                            payload.message_id,
+                            starboard_message.id,
+                            authorId=payload.user_id,
+                            channelId=payload.channel_id,
                         )
 
     @commands.Cog.listener()
@@ -141,11 +264,8 @@ class Starboard(commands.Cog, name="Starboard"):
             # Only use this in guilds
             return
 
-        entries = await self.bot.db.config.get_all()
-        guilds = list(map(lambda e: e["_id"], entries))
-        if payload.guild_id in guilds:
-            guild = list(filter(lambda e: e["_id"] == payload.guild_id, entries))
-            guild = guild[0]
+        guild = await self.bot.db.guild_configs.get(payload.guild_id)
+        if guild:
             emoji = guild.get("emoji") or "⭐"
 
             if not guild.get("starboard_channel"):
@@ -159,47 +279,36 @@ class Starboard(commands.Cog, name="Starboard"):
             if str(payload.emoji) == emoji:
                 channel = self.bot.get_channel(payload.channel_id)
                 try:
-                    msg = await channel.fetch_message(payload.message_id)
-                    reacts = msg.reactions
-                    reacts = list(filter(lambda r: str(r.emoji) == emoji, reacts))
+                    stars = await self.get_star_count(
+                        channel, payload.message_id, emoji
+                    )
                 except disnake.HTTPException:
                     return await channel.send(
                         "An error occurred while fetching the message"
                     )
 
-                if reacts:
-                    react = list(map(lambda u: u.id, await reacts[0].users().flatten()))
-                    if msg.author.id in react:
-                        del react[react.index(msg.author.id)]
-
+                stars.remove(payload.user_id)
+                if stars:
                     thresh = guild.get("emoji_threshold") or 3
-                    if len(react) >= thresh:
+                    if len(stars) >= thresh:
                         # We should now be 'adding' this to our starboard
                         # So lets just check its not already in it haha
                         # and if it is, update the message rather then make a new one
                         starboard = self.bot.get_channel(guild["starboard_channel"])
 
-                        existing_star = await self.bot.db.starboard.find(
-                            {
-                                "_id": payload.message_id,
-                                "guildId": payload.guild_id,
-                                "channelId": payload.channel_id,
-                            }
+                        starred = await self.bot.db.starred_messages.get(
+                            payload.guild_id
                         )
-                        if not existing_star:
-                            return
 
                         # This message is already in the starboard, update the star count
-                        if not existing_star.get("starboard_message_id"):
-                            # Guard against old starboard items
+                        if not starred.get(payload.message_id):
+                            # Not starred, or an old starboard item
                             return
 
-                        existing_message = await starboard.fetch_message(
-                            existing_star["starboard_message_id"]
-                        )
-                        await existing_message.edit(
-                            content=f"{len(react)} | {channel.mention}",
-                            embed=existing_message.embeds[0],
+                        self.edit_star_count(
+                            starboard,
+                            starred[payload.message_id],
+                            f"{len(stars)} {emoji} | {channel.mention}",
                         )
 
 
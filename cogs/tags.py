@@ -1,16 +1,21 @@
+import asyncio
 import logging
-from typing import Dict, List, Optional
+import os
+from bisect import bisect_left, insort
+from typing import Any, Dict, Iterable, List, Optional, Tuple
 
 import disnake
 from alaric import Document
-from bot_base import PrefixNotFound, BotContext
+from bot_base import BotContext
 from bot_base.paginators.disnake_paginator import DisnakePaginator
 from bot_base.wraps import WrappedMember
 from disnake import Interaction
-from disnake.ext import commands
+from disnake.ext import commands, tasks
+from pymongo import ReturnDocument
 
 from pyro import Pyro, checks
-from pyro.db import Tag
+from pyro.db import Tag, TagSync
+from pyro.utils import TrigramIndex
 
 log = logging.getLogger(__name__)
 
@@ -84,23 +89,204 @@ class DropdownView(disnake.ui.View):
         return self.dropdown.values[0] if not self._timeout else None
 
 
+class TagIndex:
+    """Every tag grouped by category, and ranked by uses.
+
+    Tags must be removed before being changed in ways that
+    would move them, and uses must be added through here.
+
+    Parameters
+    ----------
+    tags: Iterable[Tag]
+        The tags to index.
+    """
+
+    def __init__(self, tags: Iterable[Tag] = ()):
+        # Categories and the tags within them are in the order they were added
+        self.categories: Dict[str, Dict[str, Tag]] = {}
+        self.ranked: List[Tag] = []
+
+        for tag in tags:
+            self.categories.setdefault(tag.category, {})[tag.name] = tag
+            self.ranked.append(tag)
+
+        self.ranked.sort(key=self._rank)
+
+    @staticmethod
+    def _rank(tag: Tag) -> Tuple[int, str]:
+        return -tag.uses, tag.name
+
+    def _find(self, tag: Tag) -> Optional[int]:
+        index = bisect_left(self.ranked, self._rank(tag), key=self._rank)
+        if index < len(self.ranked) and self.ranked[index] is tag:
+            return index
+
+        # Only happens if a tag's uses changed behind our back,
+        # or it was never indexed
+        for index, ranked in enumerate(self.ranked):
+            if ranked is tag:
+                return index
+
+        return None
+
+    def add(self, tag: Tag) -> None:
+        self.categories.setdefault(tag.category, {})[tag.name] = tag
+        insort(self.ranked, tag, key=self._rank)
+
+    def remove(self, tag: Tag) -> None:
+        category = self.categories.get(tag.category, {})
+        if category.get(tag.name) is not tag:
+            return
+
+        del category[tag.name]
+        if not category:
+            del self.categories[tag.category]
+
+        index = self._find(tag)
+        if index is not None:
+            del self.ranked[index]
+
+    def add_use(self, tag: Tag) -> None:
+        """Increment a tag's uses, moving it up the ranks if needed.
+
+        Tags which aren't indexed yet are indexed, replacing
+        any other tag indexed under the same name.
+        """
+        index = self._find(tag)
+        if index is None:
+            for category in list(self.categories.values()):
+                if tag.name in category:
+                    self.remove(category[tag.name])
+
+            tag.uses += 1
+            self.add(tag)
+            return
+
+        del self.ranked[index]
+        tag.uses += 1
+        insort(self.ranked, tag, key=self._rank)
+
+
 class Tags(commands.Cog):
     def __init__(self, bot):
         self.bot: Pyro = bot
 
         self.tags: Dict[str, Tag] = {}
+        self.tag_index: TagIndex = TagIndex()
+        # Tag names and aliases, for suggesting tags when one is misspelt
+        self.tag_names: TrigramIndex = TrigramIndex()
         self.tags_db: Document = self.bot.db.tags
+        self.flush_tag_uses.start()
+
+        # Picks up tags changed by other instances of the bot
+        self._sync: TagSync = TagSync(
+            self.tags_db,
+            self.apply_tag,
+            self.on_tag_deleted,
+            poll_interval=float(os.environ.get("TAG_SYNC_INTERVAL", 30)),
+        )
+        self._sync_task: Optional[asyncio.Task] = None
+
+    def cog_unload(self) -> None:
+        self.flush_tag_uses.cancel()
+        if self._sync_task:
+            self._sync_task.cancel()
+
+    @tasks.loop(seconds=30)
+    async def flush_tag_uses(self):
+        await self.bot.db.tag_uses.flush()
+
+    @flush_tag_uses.after_loop
+    async def after_flush_tag_uses(self):
+        # Don't lose the last few uses on unload
+        await self.bot.db.tag_uses.flush()
 
     async def update_tags(self) -> None:
         """
         Updates the locally cached tags
         """
+        # Otherwise uses not yet written would be lost from the cache
+        await self.bot.db.tag_uses.flush()
         all_tags: List[Tag] = await self.tags_db.get_all()
         for tag in all_tags:
             self.tags[tag.name.casefold()] = tag
             for alias in tag.aliases:
                 self.tags[alias.casefold()] = tag
 
+        self.tag_index = TagIndex(all_tags)
+        self.tag_names = TrigramIndex(self.tags)
+
+    async def save_tag(self, tag: Tag) -> None:
+        """Write a tag, including its in-memory uses."""
+        # The uses written already include any buffered ones
+        self.bot.db.tag_uses.discard(tag.name)
+
+        data = tag.to_dict()
+        data.pop("_id", None)
+        data.pop("updated_at", None)
+        # Stamped by the server so every instance polls by the same clock
+        written = await self.tags_db.raw_collection.find_one_and_update(
+            {"name": tag.name},
+            {"$set": data, "$currentDate": {"updated_at": True}},
+            projection={"updated_at": True},
+            upsert=True,
+            return_document=ReturnDocument.AFTER,
+        )
+        tag._id = written["_id"]
+        tag.updated_at = written["updated_at"]
+
+    def apply_tag(self, tag: Tag) -> None:
+        """Cache a tag changed elsewhere, replacing the old version of it."""
+        self.forget_tag(self.tags.get(tag.name.casefold()))
+
+        # The stored uses don't yet include those still buffered here
+        tag.uses += self.bot.db.tag_uses.pending(tag.name)
+
+        self.tags[tag.name.casefold()] = tag
+        self.tag_names.add(tag.name)
+        for alias in tag.aliases:
+            self.tags[alias.casefold()] = tag
+            self.tag_names.add(alias)
+
+        self.tag_index.add(tag)
+
+    def forget_tag(self, tag: Optional[Tag]) -> None:
+        """Remove a tag and its aliases from the cache."""
+        if not tag:
+            return
+
+        for name in (tag.name, *tag.aliases):
+            if self.tags.get(name.casefold()) is tag:
+                del self.tags[name.casefold()]
+                self.tag_names.remove(name)
+
+        self.tag_index.remove(tag)
+
+    def on_tag_deleted(self, tag_id: Any) -> None:
+        for tag in self.tag_index.ranked:
+            if tag._id == tag_id:
+                self.forget_tag(tag)
+                return
+
+    def start_sync(self, delay: float = 0) -> None:
+        """Start following tag changes, restarting if it ever stops."""
+        self._sync_task = asyncio.create_task(self._run_sync(delay))
+        self._sync_task.add_done_callback(self._on_sync_done)
+
+    async def _run_sync(self, delay: float) -> None:
+        await asyncio.sleep(delay)
+        await self._sync.run()
+
+    def _on_sync_done(self, task: asyncio.Task) -> None:
+        if task.cancelled():
+            # Unloaded
+            return
+
+        log.error(
+            "Tag sync stopped unexpectedly, restarting it", exc_info=task.exception()
+        )
+        self.start_sync(delay=30)
+
     def is_tag_alias(self, tag_name) -> bool:
         """
         Returns
@@ -118,31 +304,48 @@ class Tags(commands.Cog):
 
         await self.update_tags()
 
+        if not self._sync_task or self._sync_task.done():
+            self.start_sync()
+
     @commands.Cog.listener()
     async def on_message(self, message: disnake.Message):
-        try:
-            prefix = await self.bot.get_guild_prefix(message.guild.id)
-        except (PrefixNotFound, AttributeError):
-            prefix = self.bot.DEFAULT_PREFIX
+        guild_id = message.guild.id if message.guild else None
 
-        prefix = self.bot.get_case_insensitive_prefix(message.content, prefix)
+        # Most messages aren't for us, so once the prefix is
+        # known they are turned away without awaiting anything
+        prefix = self.bot.prefixes.cached(guild_id)
+        if prefix is None:
+            prefix = await self.bot.prefixes.get(guild_id)
 
-        if not message.content.startswith(prefix):
+        tag_name = self.bot.prefixes.match(prefix, message.content)
+        if not tag_name:
             return
 
-        tag_name = message.content.replace(prefix, "").split(" ")[0]
         tag: Optional[Tag] = self.tags.get(tag_name.casefold())
         if not tag:
             # No tag found with this name
+            if message.author.bot or self.bot.get_command(tag_name):
+                return
+
+            suggestions = self.tag_names.suggest(tag_name)
+            if suggestions:
+                await message.channel.send(
+                    f"No tag called `{tag_name}` exists, did you mean "
+                    + ", ".join(f"`{prefix}{name}`" for name in suggestions)
+                    + "?",
+                    delete_after=15,
+                    allowed_mentions=disnake.AllowedMentions.none(),
+                )
+
             return
 
         log.info("Sending tag '%s'", tag.name)
 
-        tag.uses += 1
-        await self.tags_db.increment({"name": tag.name}, "uses", 1)
-
         await tag.send(message.channel, invoked_with=tag_name)
 
+        self.tag_index.add_use(tag)
+        self.bot.db.tag_uses.increment(tag.name)
+
     @commands.group(aliases=["tag"], invoke_without_command=True)
     async def tags(self, ctx: BotContext):
         """Entry level tag intro."""
@@ -206,8 +409,15 @@ class Tags(commands.Cog):
             is_embed=bool(should_embed),
             category=view.result,
         )
+        existing_tag: Optional[Tag] = self.tags.get(tag_name.casefold())
+        if existing_tag and existing_tag.name == tag.name:
+            # Overriding it
+            self.tag_index.remove(existing_tag)
+
         self.tags[tag_name.casefold()] = tag
-        await self.tags_db.upsert({"name": tag.name}, tag.to_dict())
+        self.tag_index.add(tag)
+        self.tag_names.add(tag_name)
+        await self.save_tag(tag)
         await ctx.send_basic_embed(
             f"I have created the tag `{tag_name}` for you.\n"
             f"`{ctx.prefix}{tag_name}` to invoke it."
@@ -250,14 +460,17 @@ class Tags(commands.Cog):
         is_alias = self.is_tag_alias(tag_name)
 
         tag: Tag = self.tags.pop(tag_name.casefold())
+        self.tag_names.remove(tag_name)
         if is_alias:
             tag.aliases.discard(tag_name)
-            await self.tags_db.update({"name": tag.name}, tag.to_dict())
+            await self.save_tag(tag)
 
         else:
             # Primary tag
             for alias in tag.aliases:
                 self.tags.pop(alias, None)
+                self.tag_names.remove(alias)
+            self.tag_index.remove(tag)
             await self.tags_db.delete({"name": tag_name})
 
         await ctx.send_basic_embed(
@@ -291,7 +504,8 @@ class Tags(commands.Cog):
 
         tag.aliases.add(new_alias)
         self.tags[new_alias] = tag
-        await self.tags_db.update({"name": tag.name}, tag.to_dict())
+        self.tag_names.add(new_alias)
+        await self.save_tag(tag)
 
         await ctx.send_basic_embed(
             f"Created an alias '`{new_alias}`' to pre-existing tag `{tag.name}`"
@@ -301,17 +515,9 @@ class Tags(commands.Cog):
     async def list(self, ctx: BotContext):
         """List all current tags."""
         categories: list[str] = []
-        tag_category_splits: dict[str, list[Tag]] = {}
-        all_tags: List[Tag] = await self.tags_db.get_all()
-        for tag in all_tags:
-            try:
-                tag_category_splits[tag.category].append(tag)
-            except KeyError:
-                tag_category_splits[tag.category] = [tag]
-
-        for cat, tags in tag_category_splits.items():
+        for cat, tags in self.tag_index.categories.items():
             desc = f"**{cat}**\n---\n"
-            for tag in tags:
+            for tag in tags.values():
                 desc += f"`{tag.name}` - {tag.description}\n"
 
             desc += "\n"
@@ -374,7 +580,7 @@ class Tags(commands.Cog):
             )
 
         tag.description = tag_description
-        await self.tags_db.upsert({"name": tag.name}, tag.to_dict())
+        await self.save_tag(tag)
         await ctx.send_basic_embed(
             "I have changed the description of that tag for you."
         )
@@ -405,11 +611,9 @@ class Tags(commands.Cog):
     @tags.command(aliases=["usages"])
     async def usage(self, ctx: "BotContext"):
         """Show tags, sorted by usage."""
-        all_tags: List[Tag] = await self.tags_db.get_all()
-        all_tags: List[Tag] = sorted(all_tags, key=lambda x: x.uses, reverse=True)
         tag_lists: List[str] = [
             f"Used `{tag.uses}` time{'s' if tag.uses == 1 else ''} - __{tag.name}__\n"
-            for tag in all_tags
+            for tag in self.tag_index.ranked
         ]
 
         async def format_page(pages, page_number):
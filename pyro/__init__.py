@@ -1,4 +1,17 @@
-from pyro.exceptions import BasePyroException, MenuDocsOnly
+from pyro.exceptions import (
+    BasePyroException,
+    MenuDocsOnly,
+    AnalysisFailed,
+    AnalysisQueueFull,
+    AnalysisTimedOut,
+)
 from pyro.bot import Pyro
 
-__all__ = ("Pyro", "BasePyroException", "MenuDocsOnly")
+__all__ = (
+    "Pyro",
+    "BasePyroException",
+    "MenuDocsOnly",
+    "AnalysisFailed",
+    "AnalysisQueueFull",
+    "AnalysisTimedOut",
+)
@@ -1,3 +1,4 @@
 from .conf import AUTO_HELP_CONF, Conf
 from .codebin import CodeBinExtractor
+from .analysis import AnalysisPool
 from .autohelp import AutoHelp
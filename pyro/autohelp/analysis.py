@@ -0,0 +1,267 @@
+import asyncio
+import logging
+import multiprocessing
+from multiprocessing.connection import Connection
+from multiprocessing.process import BaseProcess
+from typing import Dict, List, Set, Tuple
+
+import libcst
+from aegir import FormatError
+from libcst import ParserSyntaxError
+
+from pyro.autohelp.ast_visitor import (
+    Actions,
+    CallbackRequiresSelfVisitor,
+    ClientIsNotBot,
+    EventListenerVisitor,
+    FindPassContext,
+    HelpRuleEngine,
+    IncorrectTypeHints,
+    ProcessCommandsTransformer,
+)
+from pyro.exceptions import AnalysisFailed, AnalysisQueueFull, AnalysisTimedOut
+
+log = logging.getLogger(__name__)
+
+# Ran together in a single pass by a HelpRuleEngine
+RULES = (
+    EventListenerVisitor,
+    ClientIsNotBot,
+    ProcessCommandsTransformer,
+    CallbackRequiresSelfVisitor,
+    IncorrectTypeHints,
+    FindPassContext,
+)
+
+# The title and description shown for each error
+ERROR_MESSAGES: Dict[Actions, Tuple[str, str]] = {
+    Actions.DECORATOR_EVENT_CALLED: (
+        "Event's do not need to be called.",
+        "When defining an event on your bot variable you do not need to use brackets.",
+    ),
+    Actions.DECORATOR_LISTEN_NOT_CALLED: (
+        "Listener's must be called.",
+        "When defining a listener on your bot variable you do need to use brackets.",
+    ),
+    Actions.USING_SELF_ON_BOT_COMMAND: (
+        "Commands/events in the global scope don't take self",
+        "Looks like you're defining a command/self with `self` as the first argument "
+        "without using the correct decorator. Likely you want to remove `self` as this only "
+        "applies to method defined within a class (Cog).",
+    ),
+    Actions.CLIENT_IS_NOT_BOT: (
+        "Calling a `Bot` `client` is not recommended.",
+        "Read [here](https://tutorial.vcokltfre.dev/tips/clientbot/) for more detail.",
+    ),
+    Actions.PROCESS_COMMANDS_NOT_CALLED: (
+        "Overriding on_message without process_commands.",
+        "Looks like you override the on_message event "
+        "without processing commands.\n This means your commands "
+        "will not get called at all, you should change your event to the below.\n\n"
+        "Note: This may not be in the right place so double check it is.\n\n"
+        "You can read more about it at https://docs.disnake.dev/en/latest/faq.html"
+        "?highlight=frequently#why-does-on-message-make-my-commands-stop-working",
+    ),
+    Actions.MISSING_SELF_IN_EVENT_OR_COMMAND: (
+        "Missing self param.",
+        "Looks like you're defining an event or command in a class (Cog) without "
+        "using `self` as the first variable.\nThis will likely lead to issues and "
+        "you should change it as per the below:",
+    ),
+    Actions.INCORRECT_CTX_TYPEHINT: (
+        "Prefix commands are given a Context, not an Interaction.",
+        "Looks like you've type hinted the first argument of a prefix command "
+        "as an `Interaction`. Prefix commands are invoked with a `commands.Context`.",
+    ),
+    Actions.INCORRECT_INTERACTION_TYPEHINT: (
+        "Application commands are given an Interaction, not a Context.",
+        "Looks like you've type hinted the first argument of a slash, message or user "
+        "command as a `Context`. These commands are invoked with an `Interaction`.",
+    ),
+    Actions.USED_PASS_CONTEXT: (
+        "pass_context is no longer supported.",
+        "Looks like you're still using `pass_context`. That was a feature "
+        "back in version 0.x.x five years ago, you're likely using a fork of the now "
+        "no longer maintained discord.py which means you're on version "
+        "2.x.x.\nPlease check where you're getting this code from and read "
+        "your fork's migration guides.",
+    ),
+}
+
+
+def convert_source(code: str) -> List[FormatError]:
+    """Run every rule over the given code, returning no errors for unparsable code.
+
+    Errors which the rules can't fix have no ``fixed_cst``.
+
+    This is module level so it can be pickled across to worker processes.
+    """
+    try:
+        module = libcst.parse_module(code)
+    except ParserSyntaxError:
+        return []
+
+    engine = HelpRuleEngine(RULES)
+    fixed_module = engine.run(module)
+
+    errors: List[FormatError] = []
+    for action, node in engine.errors:
+        title, description = ERROR_MESSAGES[action]
+        if node is None:
+            old_cst, fixed_cst = module, fixed_module
+        else:
+            old_cst, fixed_cst = node, engine.fixed_node(node)
+
+        if fixed_cst.deep_equals(old_cst):
+            # Some errors can only be explained, not fixed
+            fixed_cst = None
+
+        errors.append(
+            FormatError(
+                title=title,
+                description=description,
+                old_cst=old_cst,
+                fixed_cst=fixed_cst,
+            )
+        )
+
+    return errors
+
+
+def _worker_main(connection: Connection) -> None:
+    """Analyse code sent down the connection until told to stop."""
+    while True:
+        code = connection.recv()
+        if code is None:
+            return
+
+        try:
+            connection.send((True, convert_source(code)))
+        except Exception as e:
+            connection.send((False, e))
+
+
+class _Worker:
+    """A worker process, and the connection jobs are sent over."""
+
+    __slots__ = ("process", "connection")
+
+    def __init__(self, process: BaseProcess, connection: Connection):
+        self.process: BaseProcess = process
+        self.connection: Connection = connection
+
+
+class AnalysisPool:
+    """Runs autohelp analysis in worker processes so parsing never blocks the event loop.
+
+    Parameters
+    ----------
+    max_workers: int
+        How many worker processes to use.
+        ``0`` analyses inline on the event loop instead.
+    max_pending: int
+        How many jobs can be queued or running at once,
+        any further jobs are rejected rather than queued.
+    timeout: float
+        How many seconds a single job gets before it is cancelled.
+    """
+
+    def __init__(
+        self, *, max_workers: int = 2, max_pending: int = 16, timeout: float = 10.0
+    ):
+        self.max_workers: int = max_workers
+        self.max_pending: int = max_pending
+        self.timeout: float = timeout
+
+        self._pending: int = 0
+        # Every live worker, and those not running a job
+        self._workers: Set[_Worker] = set()
+        self._idle: asyncio.Queue = asyncio.Queue()
+
+    @property
+    def pending(self) -> int:
+        """How many jobs are currently queued or running."""
+        return self._pending
+
+    def _spawn(self) -> _Worker:
+        # Spawn rather than fork, forking a process with
+        # a running event loop and motor's threads is unsafe
+        context = multiprocessing.get_context("spawn")
+        connection, child_connection = context.Pipe()
+        process = context.Process(
+            target=_worker_main, args=(child_connection,), daemon=True
+        )
+        process.start()
+        child_connection.close()
+
+        worker = _Worker(process, connection)
+        self._workers.add(worker)
+        return worker
+
+    def _kill(self, worker: _Worker) -> None:
+        """Kill a worker, such as one stuck on a job."""
+        self._workers.discard(worker)
+        worker.process.kill()
+        worker.process.join()
+        # The connection closes once the thread waiting
+        # on it sees the worker die and lets go of it
+
+    async def _acquire(self) -> _Worker:
+        if self._idle.empty() and len(self._workers) < self.max_workers:
+            return self._spawn()
+
+        return await self._idle.get()
+
+    async def _run(self, code: str) -> List[FormatError]:
+        worker = await self._acquire()
+        try:
+            worker.connection.send(code)
+            ok, result = await asyncio.to_thread(worker.connection.recv)
+        except (EOFError, OSError):
+            self._kill(worker)
+            raise AnalysisFailed from None
+        except BaseException:
+            # Timed out or cancelled part way through, the worker
+            # may never finish this job so can't be reused
+            log.warning("Autohelp analysis was abandoned, killing its worker")
+            self._kill(worker)
+            raise
+
+        self._idle.put_nowait(worker)
+        if not ok:
+            raise result
+
+        return result
+
+    async def analyse(self, code: str) -> List[FormatError]:
+        """Analyse the given code, returning all found errors.
+
+        Raises
+        ------
+        AnalysisQueueFull
+            Too many jobs are already pending.
+        AnalysisTimedOut
+            The job took longer than ``timeout``.
+        AnalysisFailed
+            The worker process died during this job.
+        """
+        if self.max_workers <= 0:
+            return convert_source(code)
+
+        if self._pending >= self.max_pending:
+            raise AnalysisQueueFull
+
+        self._pending += 1
+        try:
+            return await asyncio.wait_for(self._run(code), self.timeout)
+        except asyncio.TimeoutError:
+            raise AnalysisTimedOut from None
+        finally:
+            self._pending -= 1
+
+    def close(self) -> None:
+        """Kill the worker processes, abandoning any running jobs."""
+        for worker in list(self._workers):
+            self._kill(worker)
+
+        self._idle = asyncio.Queue()
@@ -1,5 +1,7 @@
 import enum
-from typing import Optional
+from collections import defaultdict
+from functools import lru_cache
+from typing import Callable, Dict, Iterable, List, Optional, Set, Tuple, Type
 
 import libcst
 
@@ -18,120 +20,142 @@ class Actions(enum.IntFlag):
     USED_PASS_CONTEXT = enum.auto()
 
 
-class BaseHelpTransformer(libcst.CSTTransformer):
-    """Base Help Transformer which modifies nodes based on update methods and stores a list of found errors."""
+Fix = Callable[[libcst.CSTNode], libcst.CSTNode]
 
-    def __init__(self, find_all: bool = False):
-        super().__init__()
-        self.found_errors: list[Actions] = []
-        self.find_all = find_all
-        self.updates = {}
-
-    def on_visit(self, node):
-        if self.found_errors and not self.find_all:
-            # don't visit anything else
-            return False
-        res = super().on_visit(node)
-        if self.found_errors and not self.find_all:
-            # don't visit anything else
-            return False
-        return res
-
-    def on_leave(self, original_node, updated_node):
-        if changes := self.updates.get(original_node):
-            return changes(updated_node)
-        return updated_node
 
+class FunctionInfo:
+    """What the decorators on a function say about it."""
 
-class _FindNeedsSelfDecorator(libcst.CSTVisitor):
-    """Find a method that requires a self argument based on the decorators."""
+    __slots__ = ("has_deco", "needs_self", "deco")
 
     def __init__(self):
-        super().__init__()
-        self.has_deco = False
-        self.needs_self = False
+        self.has_deco: bool = False
+        self.needs_self: bool = False
         self.deco: Optional[str] = None
 
-    def visit_Decorator(self, node):
-        if isinstance(node.decorator, libcst.Call):
-            try:
-                root = node.decorator.func.value.value
-            except AttributeError:
-                return
-            meth = node.decorator.func.attr.value
-        elif isinstance(node.decorator, libcst.Attribute):
-            root = node.decorator.attr.value
-            meth = node.decorator.value.value
-        else:
-            return
+
+def classify_function(node: libcst.FunctionDef) -> FunctionInfo:
+    """Find if a function requires a self argument based on the decorators."""
+    info = FunctionInfo()
+    for decorator in node.decorators:
+        decorator = decorator.decorator
+        if isinstance(decorator, libcst.Call):
+            decorator = decorator.func
+
+        if not isinstance(decorator, libcst.Attribute) or not isinstance(
+            decorator.value, libcst.Name
+        ):
+            continue
+
+        root = decorator.value.value
+        meth = decorator.attr.value
         # find decorators that are like @thing.slash_command
         # but ensure to ignore @commands.command` since that should have self.`
         if meth in ("event", "group") or meth.endswith("command"):
-            self.has_deco = True
+            info.has_deco = True
             if root in ("commands", "nextcord"):
-                self.needs_self = True
+                info.needs_self = True
 
-            self.deco: str = meth
-            return True
+            info.deco = meth
 
+    return info
 
-class EventListenerVisitor(BaseHelpTransformer):
+
+@lru_cache(maxsize=None)
+def _find_hooks(rule: Type["BaseHelpRule"]) -> Tuple[Tuple[str, str], ...]:
+    """Find every visit_ and leave_ method on a rule, I.e. (visit, FunctionDef_params)"""
+    hooks = []
+    for name in dir(rule):
+        kind, _, target = name.partition("_")
+        if kind in ("visit", "leave") and target:
+            hooks.append((kind, target))
+
+    return tuple(hooks)
+
+
+class BaseHelpRule:
+    """Base Help Rule which is given nodes by a HelpRuleEngine and stores a list of found errors.
+
+    Rules define visit_ and leave_ methods the same way a libcst.CSTVisitor does.
+    Returning False from a visit method stops only this rule from visiting that node's children.
+    """
+
+    find_all: bool = False
+
+    def __init__(self, engine: "HelpRuleEngine"):
+        self.engine: HelpRuleEngine = engine
+        self.found_errors: list[Actions] = []
+
+    @property
+    def is_done(self) -> bool:
+        # don't visit anything else
+        return bool(self.found_errors) and not self.find_all
+
+    def add_error(
+        self,
+        action: Actions,
+        node: Optional[libcst.CSTNode] = None,
+        fix: Optional[Fix] = None,
+    ) -> None:
+        self.found_errors.append(action)
+        self.engine.errors.append((action, node))
+        if fix is not None:
+            self.engine.add_fix(node, fix)
+
+
+class EventListenerVisitor(BaseHelpRule):
     """Listeners and events should not have a self argument when not part of a class definition.
 
     Eg, bot.listen and bot.event should not have a self argument.
     """
 
-    def __init__(self, find_all: bool = True):
-        super().__init__(find_all)
+    find_all = True
 
     def visit_ClassDef(self, node: libcst.ClassDef):
         # don't check classdefs for decorators
         return False
 
     def visit_Decorator(self, node: libcst.Decorator) -> None:
-        try:
-            # TODO Actually fix this
-            if (
-                isinstance(node.decorator, libcst.Call)
-                and node.decorator.func.attr.value == "event"
-            ):
-                self.found_errors.append(Actions.DECORATOR_EVENT_CALLED)
-                # switch the event to not be called
-                self.updates[node] = lambda node: node.with_changes(
-                    decorator=node.decorator.func
-                )
-            elif (
-                isinstance(node.decorator, libcst.Attribute)
-                and node.decorator.attr.value == "listen"
-            ):
-                self.found_errors.append(Actions.DECORATOR_LISTEN_NOT_CALLED)
-                self.updates[node] = lambda node: node.with_changes(
-                    decorator=libcst.Call(node.decorator)
-                )
-        except:
-            pass
+        decorator = node.decorator
+        if (
+            isinstance(decorator, libcst.Call)
+            and isinstance(decorator.func, libcst.Attribute)
+            and decorator.func.attr.value == "event"
+        ):
+            # switch the event to not be called
+            self.add_error(
+                Actions.DECORATOR_EVENT_CALLED,
+                node,
+                lambda node: node.with_changes(decorator=node.decorator.func),
+            )
+        elif (
+            isinstance(decorator, libcst.Attribute) and decorator.attr.value == "listen"
+        ):
+            self.add_error(
+                Actions.DECORATOR_LISTEN_NOT_CALLED,
+                node,
+                lambda node: node.with_changes(decorator=libcst.Call(node.decorator)),
+            )
 
-    def visit_FunctionDef_params(self, node: libcst.FunctionDef) -> Optional[bool]:
+    def visit_FunctionDef_params(self, node: libcst.FunctionDef) -> None:
         if not node.params.params or not node.decorators:
-            return False
+            return
         first_param: libcst.Param = node.params.params[0]
         if not first_param.name.value == "self":
-            return False
+            return
         # its self and a top level method, so check for a bot decorator
         # needs a decorator with `command` in the last section and to be called
-        visitor = _FindNeedsSelfDecorator()
-        node.visit(visitor)
-        if visitor.has_deco and not visitor.needs_self:
-            self.found_errors.append(Actions.USING_SELF_ON_BOT_COMMAND)
+        info = self.engine.classify(node)
+        if info.has_deco and not info.needs_self:
 
             def update(node: libcst.FunctionDef):
                 params = node.params.with_changes(params=node.params.params[1:])
                 return node.with_changes(params=params)
 
-            self.updates[node] = update
+            self.add_error(Actions.USING_SELF_ON_BOT_COMMAND, node, update)
 
 
-class CallbackRequiresSelfVisitor(BaseHelpTransformer):
+class CallbackRequiresSelfVisitor(BaseHelpRule):
     """Callbacks require self if they are not top level or have the proper decorators."""
 
     def visit_FunctionDef(self, node: libcst.FunctionDef):
@@ -143,127 +167,62 @@ class CallbackRequiresSelfVisitor(BaseHelpTransformer):
             if first_param.name.value == "self":
                 return False
 
-        # its self and a top level method, so check for a bot decorator
-        # needs a decorator with `command` in the last section and to be called
-        visitor = _FindNeedsSelfDecorator()
-        node.visit(visitor)
-        if visitor.has_deco and visitor.needs_self:
-            self.found_errors.append(Actions.MISSING_SELF_IN_EVENT_OR_COMMAND)
+        info = self.engine.classify(node)
+        if info.has_deco and info.needs_self:
 
             def update(node: libcst.FunctionDef):
                 params = list(node.params.params)
                 params.insert(0, libcst.Param(libcst.Name("self")))
                 return node.with_deep_changes(node.params, params=params)
 
-            self.updates[node] = update
+            self.add_error(Actions.MISSING_SELF_IN_EVENT_OR_COMMAND, node, update)
 
 
-class ClientIsNotBot(BaseHelpTransformer):
+class ClientIsNotBot(BaseHelpRule):
     """Client should not be a Bot instance."""
 
     BOT_CLASSES = ("Bot", "InteractionBot")
 
     VAR_NAME = "client"
 
-    def __init__(self):
-        self.module = None
-        super().__init__()
-
-    def on_visit(self, node):
-        if not self.module:
-            self.module = node
-        return super().on_visit(node)
-
     def visit_Assign(self, node: libcst.Assign):
-        # what
         if not isinstance(node.value, libcst.Call):
             return
-        # search for client in the assign
-        found_client = False
-        possible_fix = lambda node: node
-        for target in node.targets:
-            if hasattr(target, "attr"):
-                continue
-
-            """
-            TODO Fix this better
-            if target.target.value == self.VAR_NAME:
-            AttributeError: 'Tuple' object has no attribute 'value'
-            """
-            try:
-                target_value = target.target.value
-            except AttributeError:
-                continue
-
-            if target_value == self.VAR_NAME:
-                found_client = True
-
-                def possible_fix(module: libcst.Module):
-                    # every single node of Name where the name is `client` needs to be changed to `bot`
-
-                    class Fixer(libcst.CSTTransformer):
-                        def __init__(self, var_name):
-                            self.var_name = var_name
 
-                        def leave_Name(
-                            self, node: libcst.Name, updated: libcst.Name
-                        ) -> libcst.Name:
-                            if updated.value == self.var_name:
-                                return updated.with_changes(value="bot")
-                            return updated
-
-                    return module.visit(Fixer(self.VAR_NAME))
-
-                break
-
-        if not found_client:
+        # search for client in the assign,
+        # tuple unpacking and attributes are skipped
+        if not any(
+            isinstance(target.target, libcst.Name)
+            and target.target.value == self.VAR_NAME
+            for target in node.targets
+        ):
             return
-        # search for bot in the class assigment
-        found_bot = False
 
-        # get the last call
+        # search for bot in the class assigment
         func = node.value.func
         if isinstance(func, libcst.Name):
-            if func.value in self.BOT_CLASSES:
-                found_bot = True
-
+            class_name = func.value
         elif isinstance(func, libcst.Attribute):
-            if func.attr.value in self.BOT_CLASSES:
-                found_bot = True
-
-        if not found_bot:
+            class_name = func.attr.value
+        else:
             return
 
-        self.found_errors.append(Actions.CLIENT_IS_NOT_BOT)
-        self.updates[self.module] = possible_fix
-
-
-class _FindProcessCommands(libcst.CSTVisitor):
-    """Finds all calls of a function named `process_commands()`"""
-
-    def __init__(self):
-        self.found_process_commands = False
-
-    def visit_Expr(self, node: libcst.Expr):
-        if not isinstance(node.value, libcst.Await):
-            return
-        if not isinstance(node.value.expression, libcst.Call):
-            return
-        expr = node.value.expression
-        if not hasattr(expr, "func"):
-            return
-        if not isinstance(expr.func, libcst.Attribute):
+        if class_name not in self.BOT_CLASSES:
             return
 
-        name = expr.func.attr.value
-        if name == "process_commands":
-            self.found_process_commands = True
-            return True
+        self.add_error(Actions.CLIENT_IS_NOT_BOT, node)
+        # every single node of Name where the name is `client` needs to be changed to `bot`
+        self.engine.rename(self.VAR_NAME, "bot")
 
 
-class ProcessCommandsTransformer(BaseHelpTransformer):
+class ProcessCommandsTransformer(BaseHelpRule):
     """In an on_message event, the bot should call process_commands."""
 
+    def __init__(self, engine: "HelpRuleEngine"):
+        super().__init__(engine)
+        # (on_message node, bot variable name, found process_commands)
+        self._events: List[List] = []
+
     def visit_FunctionDef(self, node: libcst.FunctionDef):
         if not node.decorators:
             return
@@ -273,34 +232,40 @@ class ProcessCommandsTransformer(BaseHelpTransformer):
         if not node.params.params:
             # no params so different error, don't handle it right now
             return
-        is_event = False
-        for decorator in node.decorators:
-            if isinstance(decorator.decorator, libcst.Call):
-                continue
-            if not isinstance(decorator.decorator, libcst.Attribute):
-                continue
 
+        for decorator in node.decorators:
             attr = decorator.decorator
+            if not isinstance(attr, libcst.Attribute):
+                continue
 
-            name = attr.attr.value
-
-            if name == "event":
+            if attr.attr.value == "event" and isinstance(attr.value, libcst.Name):
                 # get the bot name
-                bot_instance = attr.value.value
-
-                is_event = True
-                break
+                self._events.append([node, attr.value.value, False])
+                return
 
-        if not is_event:
+    def visit_Expr(self, node: libcst.Expr):
+        # look for a call to process_commands within the body of the event
+        if not self._events:
             return
+        if not isinstance(node.value, libcst.Await):
+            return
+        expr = node.value.expression
+        if not isinstance(expr, libcst.Call):
+            return
+        if not isinstance(expr.func, libcst.Attribute):
+            return
+
+        if expr.func.attr.value == "process_commands":
+            for event in self._events:
+                event[2] = True
 
-        # now we need to visit the body and look for a call to process_commands
-        visitor = _FindProcessCommands()
-        node.body.visit(visitor)
-        if visitor.found_process_commands:
+    def leave_FunctionDef(self, original_node: libcst.FunctionDef):
+        if not self._events or self._events[-1][0] is not original_node:
             return
 
-        self.found_errors.append(Actions.PROCESS_COMMANDS_NOT_CALLED)
+        _, bot_instance, found_process_commands = self._events.pop()
+        if found_process_commands:
+            return
 
         def update(node: libcst.FunctionDef):
             params = list(node.params.params)
@@ -314,7 +279,11 @@ class ProcessCommandsTransformer(BaseHelpTransformer):
                             libcst.Await(
                                 libcst.Call(
                                     libcst.Attribute(
-                                        libcst.Name(bot_instance),
+                                        libcst.Name(
+                                            self.engine.renames.get(
+                                                bot_instance, bot_instance
+                                            )
+                                        ),
                                         libcst.Name("process_commands"),
                                     ),
                                     args=[libcst.Arg(libcst.Name(message_param_name))],
@@ -327,55 +296,189 @@ class ProcessCommandsTransformer(BaseHelpTransformer):
             body = node.body.with_changes(body=body)
             return node.with_changes(body=body)
 
-        self.updates[node] = update
+        self.add_error(Actions.PROCESS_COMMANDS_NOT_CALLED, original_node, update)
 
 
-class IncorrectTypeHints(BaseHelpTransformer):
+class IncorrectTypeHints(BaseHelpRule):
     """Context objects typehinted with Interaction or vice versa."""
 
-    def __init__(self):
-        super().__init__()
-        self._typehint = None
+    def __init__(self, engine: "HelpRuleEngine"):
+        super().__init__(engine)
+        self._typehint: Optional[Tuple[str, str]] = None
+        self._error: Optional[Actions] = None
 
     def visit_FunctionDef(self, node: libcst.FunctionDef):
         # check if it is a command def
         if not node.decorators:
             return False
-        visitor = _FindNeedsSelfDecorator()
-        node.visit(visitor)
-        if not visitor.has_deco:
+        info = self.engine.classify(node)
+        if not info.has_deco:
             return False
-        if visitor.deco in ("group", "command"):
+
+        self._typehint = None
+        if info.deco in ("group", "command"):
             # check typehints for an interaction parameter
             self._typehint = ("Interaction", "Context")
             self._error = Actions.INCORRECT_CTX_TYPEHINT
-        elif visitor.deco in ("slash_command", "message_command", "user_command"):
+        elif info.deco in ("slash_command", "message_command", "user_command"):
             # check typehints for a commands parameter
             self._typehint = ("Context", "Interaction")
             self._error = Actions.INCORRECT_INTERACTION_TYPEHINT
         return True
 
     def visit_FunctionDef_params(self, node: libcst.FunctionDef) -> None:
-        if not node.params.params:
+        if not node.params.params or not self._typehint:
             # different error, no params
-            return False
+            return
         params_list = list(node.params.params)
         # this runs after checking for self checking
         index = 0
         if params_list[0].name.value == "self":
             index = 1
+        if index >= len(params_list):
+            return
         annotation = params_list[index].annotation
         if not annotation:
             return
         annotation = annotation.annotation
-        typehint: libcst.Name = getattr(annotation, "attr", annotation).value
-        if self._typehint[0] in typehint:
-            self.found_errors.append(self._error)
+        typehint = getattr(getattr(annotation, "attr", annotation), "value", None)
+        if isinstance(typehint, str) and self._typehint[0] in typehint:
+            self.add_error(self._error, params_list[index])
 
 
-class FindPassContext(BaseHelpTransformer):
+class FindPassContext(BaseHelpRule):
     """Find anywhere someone uses pass_context. This should only check decorators, but you really don't need it anywhere."""
 
     def visit_Name(self, node):
         if node.value == "pass_context":
-            self.found_errors.append(Actions.USED_PASS_CONTEXT)
+            self.add_error(Actions.USED_PASS_CONTEXT, node)
+
+
+class _FixApplier(libcst.CSTTransformer):
+    """Applies every fix found by a HelpRuleEngine in one pass."""
+
+    def __init__(
+        self,
+        updates: Dict[libcst.CSTNode, List[Fix]],
+        renames: Dict[str, str],
+        watched: Set[libcst.CSTNode],
+    ):
+        super().__init__()
+        self.updates = updates
+        self.renames = renames
+        # What each watched node became once fixed
+        self.watched = watched
+        self.fixed: Dict[libcst.CSTNode, libcst.CSTNode] = {}
+
+    def leave_Name(self, original_node: libcst.Name, updated_node: libcst.Name):
+        if new_name := self.renames.get(updated_node.value):
+            return updated_node.with_changes(value=new_name)
+        return updated_node
+
+    def on_leave(self, original_node, updated_node):
+        updated_node = super().on_leave(original_node, updated_node)
+        for fix in self.updates.get(original_node, ()):
+            updated_node = fix(updated_node)
+        if original_node in self.watched:
+            self.fixed[original_node] = updated_node
+        return updated_node
+
+
+class HelpRuleEngine(libcst.CSTVisitor):
+    """Runs many rules over a module in one traversal, then applies all their fixes in one transform.
+
+    Decorators are classified once per FunctionDef and shared between rules.
+    """
+
+    def __init__(self, rules: Iterable[Type[BaseHelpRule]]):
+        super().__init__()
+        self.rules: List[BaseHelpRule] = [rule(self) for rule in rules]
+        self.renames: Dict[str, str] = {}
+        # Every error found, alongside the node it was found on
+        self.errors: List[Tuple[Actions, Optional[libcst.CSTNode]]] = []
+        self._fixed_nodes: Dict[libcst.CSTNode, libcst.CSTNode] = {}
+
+        self._updates: Dict[libcst.CSTNode, List[Fix]] = {}
+        self._functions: Dict[libcst.FunctionDef, FunctionInfo] = {}
+        # Rules which returned False, mapped to the node they did so on
+        self._suspended: Dict[BaseHelpRule, libcst.CSTNode] = {}
+        self._hooks: Dict[Tuple[str, str], List[Tuple[BaseHelpRule, Callable]]] = (
+            defaultdict(list)
+        )
+        for rule in self.rules:
+            for kind, target in _find_hooks(type(rule)):
+                self._hooks[(kind, target)].append(
+                    (rule, getattr(rule, f"{kind}_{target}"))
+                )
+
+    @property
+    def found_errors(self) -> List[Actions]:
+        return [error for rule in self.rules for error in rule.found_errors]
+
+    def classify(self, node: libcst.FunctionDef) -> FunctionInfo:
+        try:
+            return self._functions[node]
+        except KeyError:
+            info = self._functions[node] = classify_function(node)
+            return info
+
+    def add_fix(self, node: libcst.CSTNode, fix: Fix) -> None:
+        self._updates.setdefault(node, []).append(fix)
+
+    def rename(self, old_name: str, new_name: str) -> None:
+        self.renames[old_name] = new_name
+
+    def run(self, module: libcst.Module) -> libcst.Module:
+        """Check the module against every rule, returning it with all fixes applied."""
+        module.visit(self)
+        if not self._updates and not self.renames:
+            return module
+
+        applier = _FixApplier(
+            self._updates,
+            self.renames,
+            {node for _, node in self.errors if node is not None},
+        )
+        fixed_module = module.visit(applier)
+        self._fixed_nodes = applier.fixed
+        return fixed_module
+
+    def fixed_node(self, node: libcst.CSTNode) -> libcst.CSTNode:
+        """Get what an error's node became once :meth:`run` applied every fix."""
+        return self._fixed_nodes.get(node, node)
+
+    def _should_dispatch(self, rule: BaseHelpRule) -> bool:
+        return rule not in self._suspended and not rule.is_done
+
+    def on_visit(self, node: libcst.CSTNode) -> bool:
+        for rule, visit in self._hooks.get(("visit", type(node).__name__), ()):
+            if self._should_dispatch(rule) and visit(node) is False:
+                self._suspended[rule] = node
+
+        # Nothing left to find so don't bother with the children
+        return not all(rule.is_done for rule in self.rules)
+
+    def on_leave(self, original_node: libcst.CSTNode) -> None:
+        for rule, leave in self._hooks.get(("leave", type(original_node).__name__), ()):
+            if (
+                self._suspended.get(rule, original_node) is original_node
+                and not rule.is_done
+            ):
+                leave(original_node)
+
+        if self._suspended:
+            for rule, node in list(self._suspended.items()):
+                if node is original_node:
+                    del self._suspended[rule]
+
+    def on_visit_attribute(self, node: libcst.CSTNode, attribute: str) -> None:
+        key = ("visit", f"{type(node).__name__}_{attribute}")
+        for rule, visit in self._hooks.get(key, ()):
+            if self._should_dispatch(rule):
+                visit(node)
+
+    def on_leave_attribute(self, original_node: libcst.CSTNode, attribute: str) -> None:
+        key = ("leave", f"{type(original_node).__name__}_{attribute}")
+        for rule, leave in self._hooks.get(key, ()):
+            if self._should_dispatch(rule):
+                leave(original_node)
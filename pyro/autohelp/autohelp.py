@@ -1,40 +1,79 @@
 import asyncio
 import datetime
 import difflib
+import hashlib
 import logging
 import os
-from typing import List, Optional, Tuple, Type, TypedDict
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Tuple
 
 import libcst
 import disnake
-from aegir import Aegir, ParsedData, FormatError
+from aegir import FormatError
 from bot_base.caches import TimedCache
-from libcst import ParserSyntaxError
+from bot_base.exceptions import NonExistentEntry
 
 from pyro import checks
-from pyro.autohelp import AUTO_HELP_CONF, CodeBinExtractor, Conf
+from pyro.autohelp import AUTO_HELP_CONF, AnalysisPool, CodeBinExtractor, Conf
+from pyro.exceptions import AnalysisFailed
+from pyro.utils.caches import LRUCache
 from pyro.autohelp.regexes import (
+    AUTOHELP_TRIGGER_REGEX,
+    AUTOHELP_TRIGGER_TOKENS,
     FORMATTED_CODE_REGEX,
 )
 
-from .ast_visitor import (
-    Actions,
-    BaseHelpTransformer,
-    CallbackRequiresSelfVisitor,
-    ClientIsNotBot,
-    EventListenerVisitor,
-    FindPassContext,
-    IncorrectTypeHints,
-    ProcessCommandsTransformer,
-)
-
 log = logging.getLogger(__name__)
 
 
-class Field(TypedDict):
-    name: str
-    value: str
-    inline: bool
+@dataclass
+class CachedCase:
+    """The outcome of analysing some code, shared by anyone who sends the same code."""
+
+    errors: List[FormatError]
+    view_url: Optional[str] = None
+    # False if some of the code failed to be analysed
+    is_complete: bool = True
+
+
+class UploadBatch:
+    """Uploads code to workbin concurrently as it is found.
+
+    Each node is only rendered once, and identical code is only uploaded once.
+    """
+
+    def __init__(self, auto_help: "AutoHelp"):
+        self._auto_help: AutoHelp = auto_help
+        self._rendered: Dict[libcst.CSTNode, str] = {}
+        self._uploads: Dict[str, asyncio.Task] = {}
+
+    def add(self, node: Optional[libcst.CSTNode]) -> None:
+        if node is None or node in self._rendered:
+            return
+
+        code = self._rendered[node] = libcst.Module([]).code_for_node(node)
+        if code not in self._uploads:
+            self._uploads[code] = asyncio.create_task(
+                self._auto_help.upload_to_workbin(code)
+            )
+
+    async def get_link(self, node: Optional[libcst.CSTNode]) -> Optional[str]:
+        if node is None:
+            return None
+
+        return await self._uploads[self._rendered[node]]
+
+    async def wait(self) -> None:
+        """Wait for every upload, cancelling the rest if one fails."""
+        try:
+            await asyncio.gather(*self._uploads.values())
+        except Exception:
+            self.cancel()
+            raise
+
+    def cancel(self) -> None:
+        for task in self._uploads.values():
+            task.cancel()
 
 
 class CloseButton(disnake.ui.View):
@@ -70,36 +109,68 @@ class AutoHelp:
     def __init__(self, bot):
         self.bot = bot
         self._help_cache: TimedCache = TimedCache()
-
-        # TODO Finish the rest of these
-        self.actions = {
-            Actions.CLIENT_IS_NOT_BOT: self.client_bot,
-            Actions.USING_SELF_ON_BOT_COMMAND: self.requires_self_removal,
-            Actions.MISSING_SELF_IN_EVENT_OR_COMMAND: self.requires_self_addition,
-            Actions.USED_PASS_CONTEXT: self.pass_context,
-        }
-
-        self.visitors: list[Type[BaseHelpTransformer]] = [
-            EventListenerVisitor,
-            ClientIsNotBot,
-            ProcessCommandsTransformer,
-            CallbackRequiresSelfVisitor,
-            IncorrectTypeHints,
-            FindPassContext,
-        ]
+        self._case_cache: LRUCache = LRUCache(256, ttl=datetime.timedelta(hours=1))
+        self._prefilter_checked: int = 0
+        self._prefilter_skipped: int = 0
+        self._upload_semaphore: asyncio.Semaphore = asyncio.Semaphore(4)
 
         # Settings
         self.color = 0x26F7FD
         self._code_bin: CodeBinExtractor = CodeBinExtractor(bot)
-
-    async def upload_to_workbin(self, ast: libcst.CSTNode) -> str:
-        code = libcst.Module([]).code_for_node(ast)
-        res = await self.bot.session.post(  # type: ignore
-            url="https://workbin.dev//api/new",
-            json={"content": str(code), "language": "python"},
-            headers={"Content-Type": "application/json"},
+        self._analysis: AnalysisPool = AnalysisPool(
+            max_workers=int(os.environ.get("AUTOHELP_WORKERS", 2)),
+            max_pending=int(os.environ.get("AUTOHELP_MAX_PENDING", 16)),
+            timeout=float(os.environ.get("AUTOHELP_TIMEOUT", 10)),
         )
-        paste_id = (await res.json())["key"]
+
+    def close(self) -> None:
+        self._analysis.close()
+
+    @property
+    def stats(self) -> dict[str, Any]:
+        skip_rate = self._prefilter_skipped / (self._prefilter_checked or 1)
+        return {
+            "Case cache hits": self._case_cache.hits,
+            "Case cache misses": self._case_cache.misses,
+            "Pending analyses": self._analysis.pending,
+            "Prefilter skips": f"{self._prefilter_skipped}/{self._prefilter_checked} "
+            f"({skip_rate:.1%})",
+        }
+
+    def could_need_help(self, code: str) -> bool:
+        """Cheaply check if any rule could fire on this code before paying to parse it."""
+        self._prefilter_checked += 1
+        if any(token in code for token in AUTOHELP_TRIGGER_TOKENS):
+            if AUTOHELP_TRIGGER_REGEX.search(code):
+                return True
+
+        self._prefilter_skipped += 1
+        return False
+
+    @staticmethod
+    def hash_code(contents: List[str]) -> str:
+        """Hash code such that re-pastes of the same code share a hash.
+
+        Line endings and trailing whitespace are ignored,
+        but indentation is kept as it changes what code means.
+        """
+        hasher = hashlib.blake2b(digest_size=16)
+        for code in contents:
+            lines = [line.rstrip() for line in code.replace("\r\n", "\n").split("\n")]
+            hasher.update("\n".join(lines).strip("\n").encode("utf-8"))
+            hasher.update(b"\0")
+
+        return hasher.hexdigest()
+
+    async def upload_to_workbin(self, code: str) -> str:
+        async with self._upload_semaphore:
+            async with self.bot.session.post(  # type: ignore
+                url="https://workbin.dev//api/new",
+                json={"content": code, "language": "python"},
+                headers={"Content-Type": "application/json"},
+            ) as res:
+                paste_id = (await res.json())["key"]
+
         return f"https://workbin.dev//?id={paste_id}&language=python"
 
     @staticmethod
@@ -109,9 +180,7 @@ class AutoHelp:
         except KeyError:
             return AUTO_HELP_CONF[-1]
 
-    async def build_embed(
-        self, message: disnake.Message, errors: List[FormatError]
-    ) -> disnake.Embed:
+    def build_embed(self, message: disnake.Message, view_url: str) -> disnake.Embed:
         embed = disnake.Embed(
             timestamp=message.created_at,
             color=self.color,
@@ -122,6 +191,32 @@ class AutoHelp:
         embed.set_footer(
             text="Believe this is incorrect? Let Skelmis know in discord.gg/menudocs"
         )
+        embed.description = (
+            f"I've noticed this code has some issues and fixed them for you.\n\n"
+            f"You can find the fixed code [here]({view_url})."
+        )
+
+        return embed
+
+    async def create_case(
+        self,
+        message: disnake.Message,
+        errors: List[FormatError],
+        uploads: Optional[UploadBatch] = None,
+    ) -> str:
+        """Upload the given errors as a new case, returning the url to view it.
+
+        Code for the errors is uploaded using ``uploads``
+        when given, so uploads can start before all errors are known.
+        """
+        if uploads is None:
+            uploads = UploadBatch(self)
+
+        for error in errors:
+            uploads.add(error.old_cst)
+            uploads.add(error.fixed_cst)
+
+        await uploads.wait()
 
         data = {
             "created_for": {
@@ -132,34 +227,28 @@ class AutoHelp:
         }
 
         for error in errors:
-            old_code_link = await self.upload_to_workbin(error.old_cst)
-            fixed_code_link = await self.upload_to_workbin(error.fixed_cst)
             data["errors"].append(
                 {
                     "title": error.title,
                     "description": error.description,
-                    "old_code_link": old_code_link,
-                    "fixed_code_link": fixed_code_link,
+                    "old_code_link": await uploads.get_link(error.old_cst),
+                    # None for errors which can't be fixed
+                    "fixed_code_link": await uploads.get_link(error.fixed_cst),
                 }
             )
 
-        r: ClientResponse = await self.bot.session.post(  # type: ignore
+        async with self.bot.session.post(  # type: ignore
             url="https://pyro.koldfusion.xyz/api/cases",
             json=data,
             headers={
                 "Content-Type": "application/json",
                 "X-API-KEY": os.environ["PYRO_API_KEY"],
             },
-        )
-        assert r.status == 201, "Failed to create new auto-help resource"
-        response_data = await r.json()
+        ) as r:
+            assert r.status == 201, "Failed to create new auto-help resource"
+            response_data = await r.json()
 
-        embed.description = (
-            f"I've noticed this code has some issues and fixed them for you.\n\n"
-            f"You can find the fixed code [here]({response_data['view_url']})."
-        )
-
-        return embed
+        return response_data["view_url"]
 
     async def find_code(self, message: disnake.Message) -> Optional[List[str]]:
         """
@@ -168,7 +257,7 @@ class AutoHelp:
         Returns None if no code is found.
         """
         code = []
-        paste_code = await self._code_bin.process(message.content)
+        paste_code: List[str] = await self._code_bin.process(message.content)
 
         if matches := list(FORMATTED_CODE_REGEX.finditer(message.content)):
             for match in matches:
@@ -178,8 +267,7 @@ class AutoHelp:
         else:
             code.append(message.content)
 
-        if paste_code:
-            code.append(paste_code)
+        code.extend(paste_code)
 
         return code or None
 
@@ -189,6 +277,10 @@ class AutoHelp:
 
         key = f"{message.author.id}|{message.channel.id}"
         contents = await self.find_code(message)
+        if contents:
+            # Done before the cooldown so prose doesn't use it up
+            contents = [code for code in contents if self.could_need_help(code)]
+
         if not contents or key in self._help_cache:
             return None
 
@@ -198,19 +290,18 @@ class AutoHelp:
             ttl=datetime.timedelta(minutes=5),
         )
 
-        sources: List[FormatError] = []
-        for code in contents:
-            try:
-                parsed_data: ParsedData = Aegir.convert_source(code)
-            except ParserSyntaxError:
-                continue
-
-            sources.extend(parsed_data.errors)
+        code_hash = self.hash_code(contents)
+        try:
+            case: CachedCase = self._case_cache.get_entry(code_hash)
+        except NonExistentEntry:
+            case = await self.analyse(message, contents)
+            if case.is_complete:
+                self._case_cache.add_entry(code_hash, case, override=True)
 
-        if not sources:
+        if not case.view_url:
             return None
 
-        embed = await self.build_embed(message, sources)
+        embed = self.build_embed(message, case.view_url)
 
         try:
             auto_message = await message.reply(
@@ -231,47 +322,37 @@ class AutoHelp:
 
         return embed
 
-    async def client_bot(self, message: disnake.Message) -> Field:
-        """Checks good naming conventions"""
-        return Field(
-            name="Calling a `Bot` `client` is not recommended.",
-            value="Read [here](https://tutorial.vcokltfre.dev/tips/clientbot/) for more detail.\n\n",
-        )
+    async def analyse(
+        self, message: disnake.Message, contents: List[str]
+    ) -> CachedCase:
+        """Analyse the given code, creating a case if it has any errors."""
+        is_complete = True
+        sources: List[FormatError] = []
+        # Start uploading each piece of code's errors while the rest is analysed
+        uploads: UploadBatch = UploadBatch(self)
+        for code in contents:
+            try:
+                errors: List[FormatError] = await self._analysis.analyse(code)
+            except AnalysisFailed as e:
+                log.warning(
+                    "Skipping code in Message(id=%s) as analysis failed: %s",
+                    message.id,
+                    e,
+                )
+                is_complete = False
+                continue
+            except BaseException:
+                uploads.cancel()
+                raise
 
-    async def pass_context(self, message: disnake.Message) -> Field:
-        """Checks, and notifies if people use pass_context"""
-        # Lol, cmon
-        return Field(
-            name="pass_context is no longer supported.",
-            value="Looks like you're still using `pass_context`. That was a feature "
-            "back in version 0.x.x five years ago, you're likely using a fork of the now "
-            "no longer maintained discord.py which means you're on version "
-            "2.x.x.\nPlease check where you're getting this code from and read "
-            "your fork's migration guides.",
-        )
+            for error in errors:
+                uploads.add(error.old_cst)
+                uploads.add(error.fixed_cst)
 
-    async def requires_self_removal(self, message) -> Field:
-        """
-        Look in a message and attempt to auto-help on
-        instances where members send code NOT in a cog
-        that also contains self
-        """
-        return Field(
-            name="Commands/events in the global scope don't take self",
-            value="Looks like you're defining a command/self with `self` as the first argument "
-            "without using the correct decorator. Likely you want to remove `self` as this only "
-            "applies to method defined within a class (Cog).",
-        )
+            sources.extend(errors)
 
-    async def requires_self_addition(self, message) -> Field:
-        """
-        Look in a message and attempt to auto-help on
-        instances where members send code IN a cog
-        that doesnt contain self
-        """
-        return Field(
-            name="Missing self param.",
-            value="Looks like you're defining an event or command in a class (Cog) without "
-            "using `self` as the first variable.\nThis will likely lead to issues and "
-            "you should change it as per the below:",
-        )
+        if not sources:
+            return CachedCase(errors=sources, is_complete=is_complete)
+
+        view_url = await self.create_case(message, sources, uploads)
+        return CachedCase(errors=sources, view_url=view_url, is_complete=is_complete)
@@ -1,12 +1,28 @@
-import re
-from typing import Dict, Callable
+import asyncio
+import datetime
+import json
+import logging
+from typing import Dict, Callable, List, Tuple
+
+from aiohttp import ClientResponse
+from bot_base.exceptions import NonExistentEntry
 
 from pyro.autohelp.regexes import vco_cf_worker_boi
+from pyro.utils.caches import LRUCache
+
+log = logging.getLogger(__name__)
+
+
+class PasteNotFound(Exception):
+    """This paste does not exist, or is too large to ever be used."""
 
 
 class CodeBinExtractor:
     """Fetches code from codebins for autohelp"""
 
+    # Bodies larger than this are abandoned part way through downloading
+    MAX_PASTE_SIZE = 256 * 1024
+
     def __init__(self, bot):
         self.vco_cf_worker_boi = vco_cf_worker_boi
 
@@ -19,6 +35,12 @@ class CodeBinExtractor:
             "p.vco.sh": self._extract_vco_bois,
         }
 
+        # Keyed by host/paste id
+        self._pastes: LRUCache = LRUCache(64, ttl=datetime.timedelta(hours=6))
+        self._missing_pastes: LRUCache = LRUCache(
+            256, ttl=datetime.timedelta(minutes=30)
+        )
+
         # REGEX
         self.vco_cf_worker_boi = vco_cf_worker_boi
 
@@ -26,19 +48,77 @@ class CodeBinExtractor:
 
         self.bot: Pyro = bot
 
-    async def process(self, content: str) -> str:
-        is_vco_workers = re.search(self.vco_cf_worker_boi, content)
-        if is_vco_workers:
-            url = is_vco_workers.group("url")
-            paste_id = is_vco_workers.group("id")
-            return await self._extract_vco_bois(url, paste_id)
+    async def process(self, content: str) -> List[str]:
+        """Fetch the code from every paste linked in the given content."""
+        pastes: Dict[Tuple[str, str], None] = {}
+        for match in self.vco_cf_worker_boi.finditer(content):
+            if match.group("id"):
+                pastes[(match.group("url"), match.group("id"))] = None
+
+        if not pastes:
+            return []
+
+        # One bad paste shouldn't stop the others from being helped with
+        results = await asyncio.gather(
+            *(self.fetch(url, paste_id) for url, paste_id in pastes),
+            return_exceptions=True,
+        )
+        codes = []
+        for (url, paste_id), result in zip(pastes, results):
+            if isinstance(result, Exception):
+                log.warning(
+                    "Skipping paste %s/%s as fetching it failed: %r",
+                    url,
+                    paste_id,
+                    result,
+                )
+            elif result:
+                codes.append(result)
+
+        return codes
 
-        return ""
+    async def fetch(self, url: str, paste_id: str) -> str:
+        key = f"{url}/{paste_id}"
+        try:
+            return self._pastes.get_entry(key)
+        except NonExistentEntry:
+            pass
+
+        if key in self._missing_pastes:
+            return ""
+
+        try:
+            code = await self._mappings.get(url, self._extract_vco_bois)(url, paste_id)
+        except PasteNotFound:
+            self._missing_pastes.add_entry(key, None, override=True)
+            return ""
+
+        if code:
+            self._pastes.add_entry(key, code, override=True)
+
+        return code
+
+    async def _read_capped(self, r: ClientResponse) -> bytes:
+        """Read a response body, giving up once it passes MAX_PASTE_SIZE."""
+        if (r.content_length or 0) > self.MAX_PASTE_SIZE:
+            raise PasteNotFound
+
+        body = bytearray()
+        async for chunk in r.content.iter_chunked(16 * 1024):
+            body += chunk
+            if len(body) > self.MAX_PASTE_SIZE:
+                log.debug("Abandoning paste %s as it is too large", r.url)
+                raise PasteNotFound
+
+        return bytes(body)
 
     async def _extract_vco_bois(self, url: str, paste_id: str) -> str:
         async with self.bot.session.get(f"https://{url}/api/item?key={paste_id}") as r:
+            if r.status == 404:
+                raise PasteNotFound
+
             if r.status != 200:
                 return ""
 
-            data = await r.json()
+            data = json.loads(await self._read_capped(r))
             return data["content"]
@@ -18,3 +18,26 @@ FORMATTED_CODE_REGEX = re.compile(
     r"(?P=delim)",  # match the exact same delimiter from the start again
     re.DOTALL | re.IGNORECASE,  # "." also matches newlines, case insensitive
 )
+
+# Tokens at least one autohelp rule needs before it could fire,
+# code without any of these is never worth the cost of parsing
+AUTOHELP_TRIGGER_REGEX = re.compile(
+    r"pass_context"  # FindPassContext
+    r"|\bclient\s*="  # ClientIsNotBot
+    r"|\.\s*(event|listen)\b"  # @bot.event() and @bot.listen
+    r"|\bon_message\b"  # on_message without process_commands
+    r"|\bself\b"  # self on global commands, or lack of it in cogs
+    r"|@\s*[\w.]*(command|group)\b"  # command decorators, for type hints
+)
+# Every match of the above contains one of these, and
+# plain substring checks are far cheaper than the regex
+AUTOHELP_TRIGGER_TOKENS = (
+    "pass_context",
+    "client",
+    "event",
+    "listen",
+    "on_message",
+    "self",
+    "command",
+    "group",
+)
@@ -1,7 +1,7 @@
 import logging
 import os
 from traceback import format_exception
-from typing import Optional, TYPE_CHECKING
+from typing import List, Optional, TYPE_CHECKING
 
 import disnake
 from aiohttp import ClientSession
@@ -12,6 +12,7 @@ from disnake.ext.commands import CommandNotFound
 from pyro import MenuDocsOnly
 from pyro.autohelp import AutoHelp
 from pyro.db import PyroMongoManager
+from pyro.utils import GuildPrefixes
 
 if TYPE_CHECKING:
     from bot_base import BotContext
@@ -27,11 +28,38 @@ class Pyro(BotBase):
 
         super().__init__(*args, **kwargs)
 
+        # Every prefix lookup goes through here, so each message
+        # looks its prefix up at most once and it is never stale
+        self.prefixes: GuildPrefixes = GuildPrefixes(
+            self.db.guild_configs, self.DEFAULT_PREFIX
+        )
+
         # Regex auto help
         self.auto_help: AutoHelp = AutoHelp(self)
 
         self.is_debug_mode = bool(os.environ.get("IS_LOCAL", False))
 
+    async def get_guild_prefix(self, guild_id: Optional[int] = None) -> str:
+        """Get a guild's prefix, which is the default
+        prefix for guilds without one set."""
+        return await self.prefixes.get(guild_id)
+
+    async def get_command_prefix(
+        self, bot: "Pyro", message: disnake.Message
+    ) -> List[str]:
+        guild_id = message.guild.id if message.guild else None
+        prefix = self.prefixes.cached(guild_id)
+        if prefix is None:
+            prefix = await self.prefixes.get(guild_id)
+
+        prefix = self.get_case_insensitive_prefix(message.content, prefix)
+        return commands.when_mentioned_or(prefix)(self, message)
+
+    async def close(self) -> None:
+        self.auto_help.close()
+        await self.db.tag_uses.flush()
+        await super().close()
+
     async def on_command_error(
         self, ctx: "BotContext", err: "DiscordException"
     ) -> None:
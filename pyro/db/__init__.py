@@ -1,4 +1,8 @@
 from .bot_review import BotReview
 from .guild_review import GuildReview
 from .tag import Tag
+from .tag_sync import TagSync
+from .guild_configs import GuildConfigs
+from .starred_messages import StarredMessages
+from .counter_buffer import CounterBuffer
 from .mongo_manager import PyroMongoManager
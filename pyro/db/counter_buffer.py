@@ -0,0 +1,95 @@
+import logging
+from typing import Any, Dict
+
+from alaric import Document
+from pymongo import UpdateOne
+from pymongo.errors import BulkWriteError, PyMongoError
+
+log = logging.getLogger(__name__)
+
+
+class CounterBuffer:
+    """Buffers increments to a counter field in memory,
+    writing them all in one go when flushed.
+
+    Parameters
+    ----------
+    document: Document
+        The collection the counters live in.
+    key: str
+        The field documents are found by.
+    field: str
+        The counter field to increment.
+    """
+
+    def __init__(self, document: Document, key: str, field: str):
+        self.document: Document = document
+        self.key: str = key
+        self.field: str = field
+
+        self._pending: Dict[Any, int] = {}
+
+    def __len__(self) -> int:
+        return len(self._pending)
+
+    def increment(self, value: Any, amount: int = 1) -> None:
+        """Increment the counter on the document whose key is value."""
+        self._pending[value] = self._pending.get(value, 0) + amount
+
+    def pending(self, value: Any) -> int:
+        """How much the counter on the document whose
+        key is value has been incremented since the last flush."""
+        return self._pending.get(value, 0)
+
+    def discard(self, value: Any) -> None:
+        """Forget the buffered increments for the document whose key is value.
+
+        This should be done whenever the counter is
+        overwritten with a value that already includes them.
+        """
+        self._pending.pop(value, None)
+
+    async def flush(self) -> None:
+        """Write every buffered increment.
+
+        Increments which fail to be written are
+        kept to be retried on the next flush.
+        """
+        if not self._pending:
+            return
+
+        # Anything incremented while writing goes into the next flush
+        pending, self._pending = self._pending, {}
+        increments = list(pending.items())
+        try:
+            await self.document.raw_collection.bulk_write(
+                [
+                    UpdateOne({self.key: value}, {"$inc": {self.field: amount}})
+                    for value, amount in increments
+                ],
+                ordered=False,
+            )
+        except BulkWriteError as e:
+            # Unordered writes carry on past errors, so only
+            # the increments which errored need retrying
+            failed = [increments[error["index"]] for error in e.details["writeErrors"]]
+            for value, amount in failed:
+                self.increment(value, amount)
+
+            log.error(
+                "Failed to flush %s of %s %s increments: %s",
+                len(failed),
+                len(increments),
+                self.field,
+                e,
+            )
+        except PyMongoError as e:
+            for value, amount in increments:
+                self.increment(value, amount)
+
+            log.error(
+                "Failed to flush %s %s increments: %s",
+                len(increments),
+                self.field,
+                e,
+            )
@@ -0,0 +1,73 @@
+import asyncio
+import logging
+from typing import Any, Callable, Dict, List, Optional
+
+from alaric import AQ, Document
+from alaric.comparison import EQ
+
+log = logging.getLogger(__name__)
+
+
+class GuildConfigs:
+    """A write-through cache of every guild's config document.
+
+    Every config is loaded on first use, so lookups never
+    touch Mongo. This only stays correct as long as all
+    writes to the config collection go through here.
+
+    Parameters
+    ----------
+    document: Document
+        The config collection to cache.
+    """
+
+    def __init__(self, document: Document):
+        self.document: Document = document
+
+        self._configs: Dict[int, Dict[str, Any]] = {}
+        self._loaded: bool = False
+        self._load_lock: asyncio.Lock = asyncio.Lock()
+        self._listeners: List[Callable[[int], None]] = []
+
+    def add_listener(self, callback: Callable[[int], None]) -> None:
+        """Call callback with a guild's id whenever its config is set,
+        so that anything derived from the config can be invalidated."""
+        self._listeners.append(callback)
+
+    async def _ensure_loaded(self) -> None:
+        if self._loaded:
+            return
+
+        async with self._load_lock:
+            if self._loaded:
+                return
+
+            entries = await self.document.get_all()
+            self._configs = {entry["_id"]: entry for entry in entries}
+            self._loaded = True
+            log.info("Cached %s guild configs", len(self._configs))
+
+    async def get(self, guild_id: int) -> Optional[Dict[str, Any]]:
+        """Get a guild's config.
+
+        Notes
+        -----
+        The returned dict is the cached copy, and
+        should not be modified. Use :meth:`set` instead.
+        """
+        await self._ensure_loaded()
+        return self._configs.get(guild_id)
+
+    async def set(self, guild_id: int, **fields: Any) -> None:
+        """Set the given fields on a guild's config,
+        creating the config if it doesn't exist yet."""
+        await self._ensure_loaded()
+        await self.document.upsert(AQ(EQ("_id", guild_id)), {"_id": guild_id, **fields})
+
+        # Replace rather than mutate so anyone holding the old config isn't surprised
+        config = dict(self._configs.get(guild_id, {"_id": guild_id}))
+        config.update(fields)
+        self._configs[guild_id] = config
+
+        for callback in self._listeners:
+            callback(guild_id)
@@ -1,7 +1,14 @@
 from bot_base.db import MongoManager
 from alaric import Document
 
-from pyro.db import GuildReview, BotReview, Tag
+from pyro.db import (
+    GuildReview,
+    BotReview,
+    Tag,
+    GuildConfigs,
+    StarredMessages,
+    CounterBuffer,
+)
 
 
 class PyroMongoManager(MongoManager):
@@ -23,3 +30,10 @@ class PyroMongoManager(MongoManager):
             self.db, "guild_reviews", converter=GuildReview
         )
         self.tags: Document = Document(self.db, "tags", converter=Tag)
+
+        # Tag uses are written behind so sending a tag never waits on Mongo
+        self.tag_uses: CounterBuffer = CounterBuffer(self.tags, "name", "uses")
+
+        # Config is read on hot paths such as reactions
+        self.guild_configs: GuildConfigs = GuildConfigs(self.config)
+        self.starred_messages: StarredMessages = StarredMessages(self.starboard)
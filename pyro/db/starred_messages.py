@@ -0,0 +1,94 @@
+import asyncio
+import logging
+from typing import Any, Dict, Optional
+
+from alaric import AQ, Document
+from alaric.comparison import EQ
+
+log = logging.getLogger(__name__)
+
+
+class StarredMessages:
+    """A write-through cache of which messages are
+    on each guild's starboard.
+
+    Every starred message is loaded on first use, so
+    checking if a message is already on the starboard
+    never touches Mongo. This only stays correct as long
+    as all writes to the starboard collection go through here.
+
+    Parameters
+    ----------
+    document: Document
+        The starboard collection to cache.
+    """
+
+    def __init__(self, document: Document):
+        self.document: Document = document
+
+        # Guild id -> starred message id -> starboard message id
+        self._starred: Dict[int, Dict[int, Optional[int]]] = {}
+        self._loaded: bool = False
+        self._load_lock: asyncio.Lock = asyncio.Lock()
+
+    async def _ensure_loaded(self) -> None:
+        if self._loaded:
+            return
+
+        async with self._load_lock:
+            if self._loaded:
+                return
+
+            starred: Dict[int, Dict[int, Optional[int]]] = {}
+            cursor = self.document.raw_collection.find(
+                {}, {"guildId": 1, "starboard_message_id": 1}
+            )
+            async for entry in cursor:
+                starred.setdefault(entry["guildId"], {})[entry["_id"]] = entry.get(
+                    "starboard_message_id"
+                )
+
+            self._starred = starred
+            self._loaded = True
+            log.info(
+                "Cached %s starred messages across %s guilds",
+                sum(map(len, starred.values())),
+                len(starred),
+            )
+
+    async def load(self) -> None:
+        """Load every starred message now rather than on first use."""
+        await self._ensure_loaded()
+
+    async def get(self, guild_id: int) -> Dict[int, Optional[int]]:
+        """Get the messages on a guild's starboard, mapped to the
+        starboard message showing them. This is ``None``
+        for messages starred before that was stored.
+
+        Notes
+        -----
+        The returned dict may be the cached copy, and
+        should not be modified. Use :meth:`add` instead.
+        """
+        await self._ensure_loaded()
+        return self._starred.get(guild_id, {})
+
+    async def add(
+        self,
+        guild_id: int,
+        message_id: int,
+        starboard_message_id: int,
+        **fields: Any,
+    ) -> None:
+        """Store that a message has been put on a guild's starboard."""
+        await self._ensure_loaded()
+        await self.document.upsert(
+            AQ(EQ("_id", message_id)),
+            {
+                "_id": message_id,
+                "guildId": guild_id,
+                "starboard_message_id": starboard_message_id,
+                **fields,
+            },
+        )
+        self._starred.setdefault(guild_id, {})[message_id] = starboard_message_id
@@ -1,5 +1,6 @@
+import datetime
 from io import BytesIO
-from typing import Dict
+from typing import Dict, Optional
 
 import disnake
 from disnake import Message, abc, utils, AllowedMentions
@@ -16,6 +17,7 @@ class Tag:
         is_embed: bool = True,
         aliases: list[str] = None,
         uses: int = 0,
+        updated_at: Optional[datetime.datetime] = None,
         _id=None,
     ):
         # _id is auto genned
@@ -27,6 +29,7 @@ class Tag:
         self.is_embed: bool = is_embed
         self.creator_id: int = creator_id
         self.description: str = description
+        self.updated_at: Optional[datetime.datetime] = updated_at
 
         if not aliases:
             aliases = []
@@ -60,6 +63,9 @@ class Tag:
         if self._id:
             data["_id"] = self._id
 
+        if self.updated_at:
+            data["updated_at"] = self.updated_at
+
         return data
 
     def as_file(self) -> disnake.File:
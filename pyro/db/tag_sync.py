@@ -0,0 +1,151 @@
+import asyncio
+import datetime
+import logging
+from typing import Any, Callable, Optional, Set
+
+import pymongo
+from alaric import Document
+from pymongo.errors import OperationFailure, PyMongoError
+
+from pyro.db import Tag
+
+log = logging.getLogger(__name__)
+
+
+class TagSync:
+    """Follows the changes made to tags by other bot instances.
+
+    A change stream is used where the deployment supports
+    them, which is only replica sets. Otherwise tags updated
+    since the last poll are fetched every so often, alongside
+    every tag id to spot deleted tags. Tags are stamped with the
+    database server's clock when written, so polls go by it too.
+
+    Parameters
+    ----------
+    document: Document
+        The tags collection.
+    on_update: Callable[[Tag], None]
+        Called with every created or changed tag.
+    on_delete: Callable[[Any], None]
+        Called with the id of every deleted tag.
+    poll_interval: float
+        How many seconds to wait between polls.
+    """
+
+    def __init__(
+        self,
+        document: Document,
+        on_update: Callable[[Tag], None],
+        on_delete: Callable[[Any], None],
+        *,
+        poll_interval: float = 30,
+    ):
+        self.document: Document = document
+        self.on_update: Callable[[Tag], None] = on_update
+        self.on_delete: Callable[[Any], None] = on_delete
+        self.poll_interval: float = poll_interval
+
+        self._resume_token: Optional[dict] = None
+
+    async def run(self) -> None:
+        """Follow changes until cancelled."""
+        while True:
+            try:
+                await self.watch()
+            except OperationFailure as e:
+                log.info("Tag change streams are unavailable, polling instead: %s", e)
+                break
+            except PyMongoError as e:
+                log.warning("Lost the tag change stream, resuming: %s", e)
+                await asyncio.sleep(5)
+
+        await self.poll()
+
+    async def watch(self) -> None:
+        """Apply changes from a change stream as they happen.
+
+        Raises
+        ------
+        OperationFailure
+            Change streams are not supported here
+        """
+        async with self.document.raw_collection.watch(
+            full_document="updateLookup", resume_after=self._resume_token
+        ) as stream:
+            async for change in stream:
+                self._resume_token = stream.resume_token
+                if change["operationType"] == "delete":
+                    self._delete(change["documentKey"]["_id"])
+                elif change.get("fullDocument"):
+                    self._update(change["fullDocument"])
+
+    def _update(self, entry: dict) -> None:
+        # One bad tag shouldn't stop every other tag syncing
+        try:
+            self.on_update(Tag(**entry))
+        except Exception:
+            log.exception("Failed to sync the tag %r, skipping it", entry.get("_id"))
+
+    def _delete(self, tag_id: Any) -> None:
+        try:
+            self.on_delete(tag_id)
+        except Exception:
+            log.exception("Failed to sync deleting the tag %r, skipping it", tag_id)
+
+    async def server_time(self) -> datetime.datetime:
+        """Get the current time on the database server."""
+        hello = await self.document.raw_collection.database.command("hello")
+        return hello["localTime"]
+
+    async def poll(self) -> None:
+        """Apply changes by polling for them."""
+        collection = self.document.raw_collection
+        since: Optional[datetime.datetime] = None
+        # Timestamps are only to the millisecond, so tags written
+        # in the same one as since are fetched again next poll
+        # and skipped if they were already applied
+        applied_at_since: Set[Any] = set()
+        known_ids: Optional[Set[Any]] = None
+        while True:
+            try:
+                if known_ids is None:
+                    await collection.create_index([("updated_at", pymongo.ASCENDING)])
+                    latest = await collection.find_one(
+                        {"updated_at": {"$ne": None}},
+                        sort=[("updated_at", pymongo.DESCENDING)],
+                    )
+                    # Otherwise every tag would be refetched each
+                    # poll until one was written with a timestamp
+                    if latest:
+                        since = latest["updated_at"]
+                        applied_at_since = set(
+                            await collection.distinct("_id", {"updated_at": since})
+                        )
+                    else:
+                        since = await self.server_time()
+                        applied_at_since = set()
+                    known_ids = set(await collection.distinct("_id"))
+
+                await asyncio.sleep(self.poll_interval)
+
+                async for entry in collection.find(
+                    {"updated_at": {"$gte": since}},
+                    sort=[("updated_at", pymongo.ASCENDING)],
+                ):
+                    if entry["updated_at"] > since:
+                        since = entry["updated_at"]
+                        applied_at_since = set()
+                    elif entry["_id"] in applied_at_since:
+                        continue
+
+                    applied_at_since.add(entry["_id"])
+                    self._update(entry)
+
+                ids = set(await collection.distinct("_id"))
+                for deleted_id in known_ids - ids:
+                    self._delete(deleted_id)
+
+                known_ids = ids
+            except PyMongoError as e:
+                log.warning("Failed to poll for tag changes: %s", e)
@@ -23,3 +23,15 @@ class MenuDocsOnly(CheckFailure):
         self.module: str = module
         self.command_name: str = command_name
         self.prefix: str = prefix
+
+
+class AnalysisFailed(BasePyroException):
+    """Failed to analyse the provided code."""
+
+
+class AnalysisQueueFull(AnalysisFailed):
+    """Too many pieces of code are already waiting to be analysed."""
+
+
+class AnalysisTimedOut(AnalysisFailed):
+    """Analysing the provided code took too long."""
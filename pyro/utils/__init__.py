@@ -1,2 +1,13 @@
 from .enums import Winner
-from .games import TicTacToe, PlayerStats, InvalidMove
+from .games import (
+    TicTacToe,
+    PlayerStats,
+    InvalidMove,
+    Leaderboard,
+    GameSession,
+    GameSessions,
+)
+from .caches import LRUCache
+from .fuzzy import FuzzyIndex, TrigramIndex
+from .edits import EditCoalescer
+from .prefixes import GuildPrefixes, compile_prefix
@@ -0,0 +1,83 @@
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from typing import Any, Optional
+
+from bot_base.caches import Entry
+from bot_base.caches.abc import Cache
+from bot_base.exceptions import ExistingEntry, NonExistentEntry
+
+
+class LRUCache(Cache):
+    """A size bounded cache which evicts the least recently used entry first.
+
+    Entries can also expire in the same way as
+    :class:`bot_base.caches.TimedCache` entries do.
+
+    Parameters
+    ----------
+    max_size: int
+        The most entries this cache will hold at once.
+    ttl: timedelta, optional
+        How long entries are valid for when
+        one isn't given to :meth:`add_entry`.
+        Defaults to forever
+    """
+
+    __slots__ = ("cache", "max_size", "ttl", "hits", "misses")
+
+    def __init__(self, max_size: int = 128, *, ttl: Optional[timedelta] = None):
+        self.cache: OrderedDict[Any, Entry] = OrderedDict()
+        self.max_size: int = max_size
+        self.ttl: Optional[timedelta] = ttl
+
+        self.hits: int = 0
+        self.misses: int = 0
+
+    def __contains__(self, item: Any) -> bool:
+        try:
+            entry = self.cache[item]
+        except KeyError:
+            return False
+
+        if entry.expiry_time and entry.expiry_time < datetime.now():
+            self.delete_entry(item)
+            return False
+
+        return True
+
+    def __len__(self) -> int:
+        return len(self.cache)
+
+    def add_entry(
+        self, key: Any, value: Any, *, ttl: timedelta = None, override: bool = False
+    ) -> None:
+        if key in self and not override:
+            raise ExistingEntry
+
+        ttl = ttl or self.ttl
+        if ttl:
+            self.cache[key] = Entry(value=value, expiry_time=(datetime.now() + ttl))
+        else:
+            self.cache[key] = Entry(value=value)
+
+        self.cache.move_to_end(key)
+        while len(self.cache) > self.max_size:
+            self.cache.popitem(last=False)
+
+    def delete_entry(self, key: Any) -> None:
+        self.cache.pop(key, None)
+
+    def get_entry(self, key: Any) -> Any:
+        if key not in self:
+            self.misses += 1
+            raise NonExistentEntry
+
+        self.hits += 1
+        self.cache.move_to_end(key)
+        return self.cache[key].value
+
+    def force_clean(self) -> None:
+        now = datetime.now()
+        for k, v in list(self.cache.items()):
+            if v.expiry_time and v.expiry_time < now:
+                self.delete_entry(k)
@@ -0,0 +1,91 @@
+import asyncio
+import datetime
+import logging
+from typing import Any, Awaitable, Callable, Dict
+
+import disnake
+from bot_base.exceptions import NonExistentEntry
+
+from pyro.utils.caches import LRUCache
+
+log = logging.getLogger(__name__)
+
+
+class EditCoalescer:
+    """Coalesces bursts of edits to the same message into one.
+
+    Edits wait a short while before being made, and any
+    made in the meantime replace them. Messages are also
+    remembered once fetched so they needn't be fetched again.
+
+    Parameters
+    ----------
+    delay: float
+        How many seconds to wait before editing a message.
+    """
+
+    def __init__(self, *, delay: float = 2.0):
+        self.delay: float = delay
+
+        # Keyed by message id
+        self._messages: LRUCache = LRUCache(256, ttl=datetime.timedelta(hours=6))
+        self._pending: Dict[int, Dict[str, Any]] = {}
+        self._tasks: Dict[int, asyncio.Task] = {}
+
+        self.edits: int = 0
+        self.edits_saved: int = 0
+
+    def close(self) -> None:
+        for task in self._tasks.values():
+            task.cancel()
+
+    def edit(
+        self,
+        message_id: int,
+        fetch: Callable[[], Awaitable[disnake.Message]],
+        **fields: Any,
+    ) -> None:
+        """Edit a message soon, unless another edit comes in first.
+
+        Parameters
+        ----------
+        message_id: int
+            The message to edit.
+        fetch: Callable[[], Awaitable[disnake.Message]]
+            Fetches the message if it isn't already known.
+        fields
+            What to edit, as passed to :meth:`disnake.Message.edit`
+        """
+        if message_id in self._pending:
+            self.edits_saved += 1
+
+        self._pending[message_id] = fields
+        if message_id not in self._tasks:
+            self._tasks[message_id] = asyncio.create_task(
+                self._run_edits(message_id, fetch)
+            )
+
+    async def _run_edits(
+        self, message_id: int, fetch: Callable[[], Awaitable[disnake.Message]]
+    ) -> None:
+        try:
+            # Edits made while a previous one is in flight are picked up here
+            while message_id in self._pending:
+                await asyncio.sleep(self.delay)
+                fields = self._pending.pop(message_id)
+
+                try:
+                    try:
+                        message = self._messages.get_entry(message_id)
+                    except NonExistentEntry:
+                        message = await fetch()
+
+                    await message.edit(**fields)
+                except disnake.HTTPException as e:
+                    self._messages.delete_entry(message_id)
+                    log.warning("Failed to edit message %s: %s", message_id, e)
+                else:
+                    self._messages.add_entry(message_id, message, override=True)
+                    self.edits += 1
+        finally:
+            del self._tasks[message_id]
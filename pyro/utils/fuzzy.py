@@ -0,0 +1,318 @@
+import heapq
+import re
+from array import array
+from bisect import bisect_left, bisect_right
+from collections import Counter
+from itertools import compress
+from typing import Dict, Iterable, List, Set, Tuple
+
+# Turns a bitset formatted in binary into selectors for itertools.compress
+_SELECTORS = bytes.maketrans(b"01", b"\x00\x01")
+
+
+class FuzzyIndex:
+    """A precomputed index for case insensitive subsequence searches.
+
+    Results are ranked exactly as searching every name with the
+    regex ``".*?".join(query)`` would rank them. That is by the
+    length of the leftmost match, then where it starts, then by name.
+
+    The leftmost match always starts at the first occurrence of
+    the query's first character. So every name is indexed by its
+    suffixes starting at the first occurrence of each character,
+    and names with a match as short as the query itself are those
+    with such a suffix starting with the query. Nothing else can
+    rank above them, so other names are only matched when there
+    are fewer of these than were asked for.
+
+    Those other matches still need every candidate name checking,
+    so queries which fall back to them take time linear in the
+    number of names, around 12ms at worst for Python's inventory.
+    The eighth best match is often ten or more characters longer
+    than the query, so no index of which characters follow which
+    can rule out most names, and one would double this index's
+    size anyway. See ``scripts/bench_rtfm_search.py``.
+
+    Parameters
+    ----------
+    names: Iterable[str]
+        The names to search over.
+    """
+
+    # How many suffixes the best keys are precomputed for at a time
+    BLOCK_SIZE = 64
+
+    __slots__ = (
+        "names",
+        "limit",
+        "_ascii_names",
+        "_ranked",
+        "_lowered",
+        "_joined",
+        "_offsets",
+        "_suffixes",
+        "_keys",
+        "_block_keys",
+        "_char_bits",
+        "_others",
+    )
+
+    def __init__(self, names: Iterable[str], *, limit: int = 8):
+        self.names: List[str] = list(names)
+        self.limit: int = limit
+
+        # Lowercasing is only the same as re.IGNORECASE for
+        # ascii, so the rare other names are always regex searched
+        self._ascii_names: List[str] = [name for name in self.names if name.isascii()]
+        self._others: List[str] = [name for name in self.names if not name.isascii()]
+        self._lowered: List[str] = [name.lower() for name in self._ascii_names]
+
+        # Where each name starts within the joined names, with a
+        # trailing offset so that offsets[i + 1] always exists
+        self._offsets: List[int] = [0]
+        for lowered in self._lowered:
+            self._offsets.append(self._offsets[-1] + len(lowered) + 1)
+        self._joined: str = "\n".join(self._lowered) + "\n"
+
+        # Every suffix starting at the first occurrence of a character, sorted,
+        # alongside what it scores if it matches. Keys are packed so that
+        # sorting them sorts by where the suffix starts then by name
+        self._ranked: List[str] = sorted(self._ascii_names)
+        ranks = {name: rank for rank, name in enumerate(self._ranked)}
+        suffixes = []
+        for offset, lowered, name in zip(
+            self._offsets, self._lowered, self._ascii_names
+        ):
+            rank = ranks[name]
+            seen = set()
+            for position, char in enumerate(lowered):
+                if char not in seen:
+                    seen.add(char)
+                    suffixes.append(
+                        (
+                            lowered[position:],
+                            offset + position,
+                            position * len(self._ranked) + rank,
+                        )
+                    )
+
+        suffixes.sort()
+        self._suffixes: array = array("L", [offset for _, offset, _ in suffixes])
+        self._keys: array = array("Q", [key for _, _, key in suffixes])
+
+        # The best keys within each block, padded out to limit keys per block
+        padding = [2**64 - 1] * limit
+        self._block_keys: array = array("Q")
+        for block in range(0, len(self._keys), self.BLOCK_SIZE):
+            best = sorted(self._keys[block : block + self.BLOCK_SIZE])[:limit]
+            self._block_keys.extend(best + padding[len(best) :])
+
+        # Bit i is set if the i-th name contains this character
+        bitmaps: Dict[str, bytearray] = {}
+        size = len(self._lowered) // 8 + 1
+        for i, lowered in enumerate(self._lowered):
+            for char in set(lowered):
+                if char not in bitmaps:
+                    bitmaps[char] = bytearray(size)
+                bitmaps[char][i >> 3] |= 1 << (i & 7)
+
+        self._char_bits: Dict[str, int] = {
+            char: int.from_bytes(bitmap, "little") for char, bitmap in bitmaps.items()
+        }
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+    def search(self, text: str) -> List[str]:
+        """Find the best matching names, best first."""
+        text = str(text)
+        if "\n" in text:
+            # Names never contain newlines
+            return []
+
+        if not text:
+            return sorted(self.names)[: self.limit]
+
+        if text.isascii():
+            scored = self._search_ascii(text.lower())
+            others = self._others
+        else:
+            scored = []
+            others = self.names
+
+        if others:
+            pattern = re.compile(".*?".join(map(re.escape, text)), flags=re.IGNORECASE)
+            for name in others:
+                match = pattern.search(name)
+                if match:
+                    scored.append((len(match.group()), match.start(), name))
+
+        return [name for _, _, name in heapq.nsmallest(self.limit, scored)]
+
+    def _search_ascii(self, query: str) -> List[Tuple[int, int, str]]:
+        size = len(query)
+        joined = self._joined
+
+        # Suffixes starting with the query are one contiguous run
+        lo = bisect_left(self._suffixes, query, key=lambda o: joined[o : o + size])
+        hi = bisect_right(self._suffixes, query, lo, key=lambda o: joined[o : o + size])
+
+        if hi - lo >= self.limit:
+            # Whole blocks within the run only need their best keys checking
+            first_block = -(-lo // self.BLOCK_SIZE)
+            last_block = hi // self.BLOCK_SIZE
+            if first_block < last_block:
+                keys = (
+                    self._keys[lo : first_block * self.BLOCK_SIZE].tolist()
+                    + self._block_keys[
+                        first_block * self.limit : last_block * self.limit
+                    ].tolist()
+                    + self._keys[last_block * self.BLOCK_SIZE : hi].tolist()
+                )
+            else:
+                keys = self._keys[lo:hi].tolist()
+
+            names = len(self._ranked)
+            return [
+                (size, key // names, self._ranked[key % names])
+                for key in sorted(keys)[: self.limit]
+            ]
+
+        # Otherwise every name containing each character of the query could match.
+        # From the first occurrence of the first character lazily matching
+        # takes the next occurrence of each character, as do negated classes
+        candidates = -1
+        for char in set(query):
+            candidates &= self._char_bits.get(char, 0)
+        if not candidates:
+            return []
+
+        pattern = re.compile(
+            "[^{0}]*({0}{1})".format(
+                re.escape(query[0]),
+                "".join("[^{0}]*{0}".format(re.escape(char)) for char in query[1:]),
+            )
+        )
+        selectors = format(candidates, "b")[::-1].encode().translate(_SELECTORS)
+        scored = []
+        for name, lowered in zip(
+            compress(self._ascii_names, selectors), compress(self._lowered, selectors)
+        ):
+            match = pattern.match(lowered)
+            if match:
+                start, end = match.span(1)
+                scored.append((end - start, start, name))
+
+        return scored
+
+
+def edit_distance(first: str, second: str) -> int:
+    """How many insertions, deletions, substitutions or swaps of
+    adjacent characters it takes to turn one string into the other."""
+    # Only the last two rows are needed to spot swaps
+    before_last: List[int] = []
+    last: List[int] = list(range(len(second) + 1))
+    for i in range(1, len(first) + 1):
+        row = [i]
+        for j in range(1, len(second) + 1):
+            distance = min(
+                last[j] + 1,
+                row[j - 1] + 1,
+                last[j - 1] + (first[i - 1] != second[j - 1]),
+            )
+            if (
+                i > 1
+                and j > 1
+                and first[i - 1] == second[j - 2]
+                and first[i - 2] == second[j - 1]
+            ):
+                distance = min(distance, before_last[j - 2] + 1)
+
+            row.append(distance)
+
+        before_last, last = last, row
+
+    return last[-1]
+
+
+class TrigramIndex:
+    """An index of names by their trigrams, for suggesting
+    the closest names to a misspelt one.
+
+    Names sharing the most trigrams with what was asked for
+    are ranked by their edit distance to it, and only those
+    within a few typos of it are suggested. Unlike
+    :class:`FuzzyIndex` names can be added and removed.
+
+    Parameters
+    ----------
+    names: Iterable[str]
+        The names to suggest.
+    limit: int
+        The most names to suggest at once.
+    """
+
+    # How many of the names sharing the most trigrams get their distance checked
+    CANDIDATES = 16
+
+    __slots__ = ("limit", "_names", "_trigrams")
+
+    def __init__(self, names: Iterable[str] = (), *, limit: int = 3):
+        self.limit: int = limit
+        self._names: Set[str] = set()
+        self._trigrams: Dict[str, Set[str]] = {}
+
+        for name in names:
+            self.add(name)
+
+    def __len__(self) -> int:
+        return len(self._names)
+
+    def __contains__(self, name: str) -> bool:
+        return name.casefold() in self._names
+
+    @staticmethod
+    def _split(name: str) -> Set[str]:
+        # Padding weights the start of names, where typos are rarer
+        padded = f"  {name} "
+        return {padded[i : i + 3] for i in range(len(padded) - 2)}
+
+    def add(self, name: str) -> None:
+        name = name.casefold()
+        if name in self._names:
+            return
+
+        self._names.add(name)
+        for trigram in self._split(name):
+            self._trigrams.setdefault(trigram, set()).add(name)
+
+    def remove(self, name: str) -> None:
+        name = name.casefold()
+        if name not in self._names:
+            return
+
+        self._names.discard(name)
+        for trigram in self._split(name):
+            names = self._trigrams[trigram]
+            names.discard(name)
+            if not names:
+                del self._trigrams[trigram]
+
+    def suggest(self, text: str) -> List[str]:
+        """Find the closest names, closest first."""
+        text = text.casefold()
+        shared: Counter = Counter()
+        for trigram in self._split(text):
+            shared.update(self._trigrams.get(trigram, ()))
+
+        max_distance = max(1, len(text) // 3)
+        scored = []
+        for name, _ in shared.most_common(self.CANDIDATES):
+            if abs(len(name) - len(text)) > max_distance:
+                continue
+
+            distance = edit_distance(text, name)
+            if distance <= max_distance:
+                scored.append((distance, name))
+
+        return [name for _, name in sorted(scored)[: self.limit]]
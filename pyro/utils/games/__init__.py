@@ -1 +1,8 @@
-from .tictactoe import PlayerStats, TicTacToe, InvalidMove
+from .tictactoe import (
+    GameSession,
+    GameSessions,
+    Leaderboard,
+    PlayerStats,
+    TicTacToe,
+    InvalidMove,
+)
@@ -1,2 +1,4 @@
+from .leaderboard import Leaderboard
+from .sessions import GameSession, GameSessions, render_board
 from .stats import PlayerStats
 from .tictactoe import TicTacToe, InvalidMove
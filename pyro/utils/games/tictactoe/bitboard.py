@@ -0,0 +1,68 @@
+import functools
+from math import inf as infinity
+from typing import Tuple
+
+# Boards are a pair of 9 bit masks, one per player. Bit
+# row * 3 + column is set when that player has played there
+
+# Every cell played
+FULL_BOARD = 0b111_111_111
+
+# Rows, then columns, then both diagonals
+WIN_MASKS = (
+    0b000_000_111,
+    0b000_111_000,
+    0b111_000_000,
+    0b001_001_001,
+    0b010_010_010,
+    0b100_100_100,
+    0b100_010_001,
+    0b001_010_100,
+)
+
+# Whether each possible mask contains a line
+WINNING = tuple(
+    any(mask & win == win for win in WIN_MASKS) for mask in range(FULL_BOARD + 1)
+)
+
+# The cells in each possible mask, in order
+CELLS = tuple(
+    tuple(cell for cell in range(9) if mask >> cell & 1)
+    for mask in range(FULL_BOARD + 1)
+)
+
+
+@functools.lru_cache(maxsize=None)
+def search(comp: int, human: int, depth: int, comp_to_move: bool) -> Tuple[int, float]:
+    """Minimax the given board, looking at most depth moves ahead.
+
+    Boards are scored +1 if the computer has won, -1 if the human
+    has and 0 otherwise. The first of the best moves is picked,
+    and positions are only searched once per depth.
+
+    Returns
+    -------
+    Tuple[int, float]
+        The best cell to play, or -1 if there is nowhere
+        worth playing, and the score that leads to.
+    """
+    if depth == 0 or WINNING[comp] or WINNING[human]:
+        if WINNING[comp]:
+            return -1, +1
+        elif WINNING[human]:
+            return -1, -1
+
+        return -1, 0
+
+    best_cell, best_score = -1, -infinity if comp_to_move else +infinity
+    for cell in CELLS[FULL_BOARD & ~(comp | human)]:
+        if comp_to_move:
+            _, score = search(comp | 1 << cell, human, depth - 1, False)
+            if score > best_score:
+                best_cell, best_score = cell, score
+        else:
+            _, score = search(comp, human | 1 << cell, depth - 1, True)
+            if score < best_score:
+                best_cell, best_score = cell, score
+
+    return best_cell, best_score
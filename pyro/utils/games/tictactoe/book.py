@@ -0,0 +1,125 @@
+import random
+from typing import Dict, List, Optional, Tuple
+
+from pyro.utils.games.tictactoe import bitboard
+
+Scores = Tuple[Optional[int], ...]
+
+
+def _symmetry(row: int, column: int) -> List[Tuple[int, int]]:
+    return [
+        (row, column),
+        (column, 2 - row),
+        (2 - row, 2 - column),
+        (2 - column, row),
+        (row, 2 - column),
+        (2 - row, column),
+        (column, row),
+        (2 - column, 2 - row),
+    ]
+
+
+# Where each cell moves to under each of the 8 rotations and reflections
+SYMMETRIES: Tuple[Tuple[int, ...], ...] = tuple(
+    zip(
+        *(
+            tuple(r * 3 + c for r, c in _symmetry(cell // 3, cell % 3))
+            for cell in range(9)
+        )
+    )
+)
+
+# Every mask under each symmetry
+_TRANSFORMS: Tuple[Tuple[int, ...], ...] = tuple(
+    tuple(
+        sum(1 << symmetry[cell] for cell in bitboard.CELLS[mask])
+        for mask in range(bitboard.FULL_BOARD + 1)
+    )
+    for symmetry in SYMMETRIES
+)
+
+
+def canonical(comp: int, human: int) -> Tuple[Tuple[int, int], int]:
+    """Get the orientation of a board with the smallest masks,
+    alongside which symmetry turns the board into it."""
+    return min(
+        ((transform[comp], transform[human]), index)
+        for index, transform in enumerate(_TRANSFORMS)
+    )
+
+
+def _build() -> Dict[Tuple[int, int], Scores]:
+    book: Dict[Tuple[int, int], Scores] = {}
+    seen = set()
+
+    # Either player can go first
+    stack = [(0, 0, True), (0, 0, False)]
+    while stack:
+        comp, human, comp_to_move = stack.pop()
+        key, index = canonical(comp, human)
+        if (key, comp_to_move) in seen:
+            continue
+
+        seen.add((key, comp_to_move))
+        if bitboard.WINNING[comp] or bitboard.WINNING[human]:
+            continue
+
+        cells = bitboard.CELLS[bitboard.FULL_BOARD & ~(comp | human)]
+        if comp_to_move and cells:
+            scores: List[Optional[int]] = [None] * 9
+            for cell in cells:
+                # The same search as the hardest difficulty
+                _, score = bitboard.search(
+                    comp | 1 << cell, human, len(cells) - 1, False
+                )
+                scores[SYMMETRIES[index][cell]] = score
+
+            book[key] = tuple(scores)
+
+        for cell in cells:
+            if comp_to_move:
+                stack.append((comp | 1 << cell, human, False))
+            else:
+                stack.append((comp, human | 1 << cell, True))
+
+    return book
+
+
+# Every reachable position with the computer to move, up to
+# rotation and reflection, mapped to what each move in it scores
+# with perfect play. Positions are keyed and scored in the
+# orientation with the smallest masks, see canonical
+BOOK: Dict[Tuple[int, int], Scores] = _build()
+
+
+def ranked_moves(comp: int, human: int) -> List[Tuple[int, int]]:
+    """Get every move and what it scores, best first.
+
+    Equally good moves are ordered by cell, so the first
+    move is the one a full depth :func:`bitboard.search` picks.
+    """
+    key, index = canonical(comp, human)
+    scores = BOOK[key]
+    symmetry = SYMMETRIES[index]
+    return sorted(
+        (
+            (cell, scores[symmetry[cell]])
+            for cell in bitboard.CELLS[bitboard.FULL_BOARD & ~(comp | human)]
+        ),
+        key=lambda move: (-move[1], move[0]),
+    )
+
+
+def pick_move(comp: int, human: int, difficulty: float = 1) -> int:
+    """Pick the computer's next move.
+
+    At difficulty 1 this is always the best move. Otherwise moves are
+    sampled, with each worse score being difficulty times less likely.
+    """
+    moves = ranked_moves(comp, human)
+    if difficulty <= 1:
+        return moves[0][0]
+
+    ranks = sorted({score for _, score in moves}, reverse=True)
+    weights = [difficulty ** -ranks.index(score) for _, score in moves]
+    return random.choices([cell for cell, _ in moves], weights=weights)[0]
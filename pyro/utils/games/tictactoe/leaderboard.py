@@ -0,0 +1,120 @@
+from typing import Dict, Iterator, List, Optional, Tuple
+
+
+class Leaderboard:
+    """Players ranked by a single stat, highest first.
+
+    Players are bucketed by their stat, with a Fenwick tree
+    counting how many players are in each bucket. That makes
+    changing a stat, finding a player's rank and finding who
+    is at a given position all O(log n) in the highest stat.
+
+    Players on the same stat are ordered by who got there
+    first. Players on 0 are not ranked.
+    """
+
+    __slots__ = ("_values", "_buckets", "_tree")
+
+    def __init__(self):
+        self._values: Dict[int, int] = {}
+        # Insertion ordered, so ties go to whoever got there first
+        self._buckets: Dict[int, Dict[int, None]] = {}
+        # 1 indexed by stat, with room for stats up to its length - 1
+        self._tree: List[int] = [0] * 64
+
+    def __len__(self) -> int:
+        return len(self._values)
+
+    def __iter__(self) -> Iterator[Tuple[int, int]]:
+        yield from self.page(0, len(self))
+
+    def _add(self, value: int, amount: int) -> None:
+        while value < len(self._tree):
+            self._tree[value] += amount
+            value += value & -value
+
+    def _count_up_to(self, value: int) -> int:
+        """How many players have a stat of at most value."""
+        value = min(value, len(self._tree) - 1)
+        total = 0
+        while value > 0:
+            total += self._tree[value]
+            value -= value & -value
+
+        return total
+
+    def _value_at(self, index: int) -> int:
+        """Get the smallest stat which more than index players are on or under."""
+        value = 0
+        step = 1 << (len(self._tree) - 1).bit_length()
+        while step:
+            if value + step < len(self._tree) and self._tree[value + step] <= index:
+                value += step
+                index -= self._tree[value]
+
+            step >>= 1
+
+        return value + 1
+
+    def _grow(self, value: int) -> None:
+        size = len(self._tree)
+        while size <= value:
+            size *= 2
+
+        self._tree = [0] * size
+        for bucket_value, bucket in self._buckets.items():
+            self._add(bucket_value, len(bucket))
+
+    def get(self, player_id: int) -> int:
+        return self._values.get(player_id, 0)
+
+    def set(self, player_id: int, value: int) -> None:
+        """Set a player's stat, moving them on the leaderboard."""
+        old_value = self._values.pop(player_id, 0)
+        if old_value:
+            bucket = self._buckets[old_value]
+            del bucket[player_id]
+            if not bucket:
+                del self._buckets[old_value]
+
+            self._add(old_value, -1)
+
+        if value <= 0:
+            return
+
+        if value >= len(self._tree):
+            self._grow(value)
+
+        self._values[player_id] = value
+        self._buckets.setdefault(value, {})[player_id] = None
+        self._add(value, 1)
+
+    def increment(self, player_id: int, amount: int = 1) -> None:
+        self.set(player_id, self.get(player_id) + amount)
+
+    def rank(self, player_id: int) -> Optional[int]:
+        """Get a player's rank, where players on the same stat share a rank."""
+        value = self._values.get(player_id)
+        if not value:
+            return None
+
+        return len(self) - self._count_up_to(value) + 1
+
+    def page(self, start: int, size: int) -> List[Tuple[int, int]]:
+        """Get the player ids and stats of the
+        players from position start onwards."""
+        entries = []
+        position = max(start, 0)
+        while len(entries) < size and position < len(self):
+            # Positions count down from the highest stat
+            value = self._value_at(len(self) - 1 - position)
+            bucket = self._buckets[value]
+            above = len(self) - self._count_up_to(value)
+            for player_id in list(bucket)[position - above :]:
+                entries.append((player_id, value))
+                if len(entries) == size:
+                    break
+
+            position = above + len(bucket)
+
+        return entries
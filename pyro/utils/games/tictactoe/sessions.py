@@ -0,0 +1,171 @@
+import asyncio
+import functools
+from typing import Dict, Optional, Tuple
+
+import disnake
+
+from pyro.utils.enums import Piece
+from pyro.utils.games.tictactoe import bitboard
+from pyro.utils.games.tictactoe.tictactoe import TicTacToe
+
+BOARD_TEMPLATE = """
+        ```yaml
+          1|2|3
+        1|{}|{}|{}
+        2|{}|{}|{}
+        3|{}|{}|{}
+        ```
+        """
+
+
+# There are only a few thousand legal boards, so keep them all
+@functools.lru_cache(maxsize=None)
+def render_board(player_one_mask: int, player_two_mask: int) -> str:
+    """Get the embed description showing a board."""
+    pieces = [Piece.NULL.to_piece()] * 9
+    for cell in bitboard.CELLS[player_one_mask]:
+        pieces[cell] = Piece.PLAYER_ONE.to_piece()
+
+    for cell in bitboard.CELLS[player_two_mask]:
+        pieces[cell] = Piece.PLAYER_TWO.to_piece()
+
+    return BOARD_TEMPLATE.format(*pieces)
+
+
+class GameSession:
+    """A game being played, and the message showing it.
+
+    Parameters
+    ----------
+    game: TicTacToe
+        The game being played.
+    channel: disnake.abc.Messageable
+        Where the game is being played.
+    """
+
+    __slots__ = ("game", "channel", "message", "embed", "_shown")
+
+    def __init__(self, game: TicTacToe, channel: disnake.abc.Messageable):
+        self.game: TicTacToe = game
+        self.channel: disnake.abc.Messageable = channel
+        self.message: Optional[disnake.Message] = None
+        self.embed: disnake.Embed = disnake.Embed(
+            title=f"TicTacToe ({game.player_one.display_name} VS {game.player_two.display_name})"
+        )
+
+        # The masks and content last shown
+        self._shown: Optional[Tuple[int, int, Optional[str]]] = None
+
+    @property
+    def current_player(self) -> disnake.Member:
+        if self.game.is_player_one_move:
+            return self.game.player_one
+
+        return self.game.player_two
+
+    @property
+    def players(self) -> Tuple[disnake.Member, disnake.Member]:
+        return self.game.player_one, self.game.player_two
+
+    async def show(self, content: Optional[str] = None) -> None:
+        """Show the board, only sending or editing
+        the message if what it shows has changed."""
+        shown = (self.game.player_one_mask, self.game.player_two_mask, content)
+        if shown == self._shown:
+            return
+
+        self.embed.description = render_board(*shown[:2])
+        if self.message is None:
+            self.message = await self.channel.send(content=content, embed=self.embed)
+        else:
+            await self.message.edit(content=content, embed=self.embed)
+
+        self._shown = shown
+
+
+class GameSessions:
+    """Every game of TicTacToe being played.
+
+    Rather than each game waiting on its own message listener,
+    messages are handed to :meth:`dispatch` which routes them to
+    the game waiting on that channel and author. Players can only
+    be in one game at a time, so only one game ever matches.
+    """
+
+    def __init__(self):
+        # Player id -> their game, bots aren't tracked
+        self._sessions: Dict[int, GameSession] = {}
+        # Channel id -> player id -> their next move
+        self._waiting: Dict[int, Dict[int, asyncio.Future]] = {}
+
+    def get(self, player_id: int) -> Optional[GameSession]:
+        """Get the game a player is in."""
+        return self._sessions.get(player_id)
+
+    def start(self, session: GameSession) -> Optional[disnake.Member]:
+        """Start tracking a game, unless one of its players is already in a game.
+
+        Returns
+        -------
+        Optional[disnake.Member]
+            The player already in a game, if any, in
+            which case this game was not started.
+        """
+        players = [player for player in session.players if not player.bot]
+        for player in players:
+            if player.id in self._sessions:
+                return player
+
+        for player in players:
+            self._sessions[player.id] = session
+
+        return None
+
+    def end(self, session: GameSession) -> None:
+        for player in session.players:
+            if self._sessions.get(player.id) is session:
+                del self._sessions[player.id]
+
+    async def wait_for_move(
+        self, session: GameSession, *, timeout: float
+    ) -> disnake.Message:
+        """Wait for the current player to send a message in the game's channel.
+
+        Raises
+        ------
+        asyncio.TimeoutError
+            They didn't send one in time.
+        """
+        channel_id = session.channel.id
+        player_id = session.current_player.id
+
+        future = asyncio.get_running_loop().create_future()
+        waiting = self._waiting.setdefault(channel_id, {})
+        waiting[player_id] = future
+        try:
+            return await asyncio.wait_for(future, timeout=timeout)
+        finally:
+            if waiting.get(player_id) is future:
+                del waiting[player_id]
+
+            if not waiting and self._waiting.get(channel_id) is waiting:
+                del self._waiting[channel_id]
+
+    def dispatch(self, message: disnake.Message) -> bool:
+        """Hand a message to the game waiting on it, if any.
+
+        Returns
+        -------
+        bool
+            Whether a game was waiting on this message.
+        """
+        waiting = self._waiting.get(message.channel.id)
+        if not waiting:
+            return False
+
+        future = waiting.get(message.author.id)
+        if future is None or future.done():
+            return False
+
+        future.set_result(message)
+        return True
@@ -1,10 +1,10 @@
-import math
 import random
-from math import inf as infinity
+from typing import List, Optional, Tuple
 
 import disnake
 
 from pyro.utils.enums import Winner, Piece
+from pyro.utils.games.tictactoe import bitboard, book
 
 
 class InvalidMove(Exception):
@@ -14,6 +14,8 @@ class InvalidMove(Exception):
 HUMAN = Piece.PLAYER_ONE
 COMP = Piece.PLAYER_TWO
 
+Board = List[List[Piece]]
+
 
 class TicTacToe:
     """A class representation of a tictactoe game"""
@@ -29,28 +31,82 @@ class TicTacToe:
         self.player_one: disnake.Member = player_one
         self.player_two: disnake.Member = player_two
 
-        self.board = [[Piece.NULL for _ in range(3)] for _ in range(3)]
+        # Where each player has played, see bitboard
+        self.player_one_mask: int = 0
+        self.player_two_mask: int = 0
+
         self.difficulty = difficulty
         self.is_agaisnt_computer = is_agaisnt_computer
         self.is_player_one_move = True
 
+    @property
+    def board(self) -> Board:
+        return self.to_board(self.player_one_mask, self.player_two_mask)
+
+    @board.setter
+    def board(self, board: Board) -> None:
+        self.player_one_mask, self.player_two_mask = self.to_masks(board)
+
+    @staticmethod
+    def to_board(player_one_mask: int, player_two_mask: int) -> Board:
+        board = [[Piece.NULL for _ in range(3)] for _ in range(3)]
+        for cell in bitboard.CELLS[player_one_mask]:
+            board[cell // 3][cell % 3] = Piece.PLAYER_ONE
+
+        for cell in bitboard.CELLS[player_two_mask]:
+            board[cell // 3][cell % 3] = Piece.PLAYER_TWO
+
+        return board
+
+    @staticmethod
+    def to_masks(board: Board) -> Tuple[int, int]:
+        player_one_mask = player_two_mask = 0
+        for row_index, row in enumerate(board):
+            for column_index, piece in enumerate(row):
+                if piece == Piece.PLAYER_ONE:
+                    player_one_mask |= 1 << row_index * 3 + column_index
+                elif piece == Piece.PLAYER_TWO:
+                    player_two_mask |= 1 << row_index * 3 + column_index
+
+        return player_one_mask, player_two_mask
+
+    def _masks(self, board: Optional[Board]) -> Tuple[int, int]:
+        if board is None:
+            return self.player_one_mask, self.player_two_mask
+
+        return self.to_masks(board)
+
+    @staticmethod
+    def _winner(player_one_mask: int, player_two_mask: int) -> Winner:
+        for win in bitboard.WIN_MASKS:
+            if player_one_mask & win == win:
+                return Winner.PLAYER_ONE
+            elif player_two_mask & win == win:
+                return Winner.PLAYER_TWO
+
+        return Winner.NO_WINNER
+
     async def ai_turn(self):
-        depth = len(await self.valid_moves())
+        empty = bitboard.FULL_BOARD & ~(self.player_one_mask | self.player_two_mask)
+        depth = len(bitboard.CELLS[empty])
         if depth == 9:
             x = random.choice([0, 1, 2])
             y = random.choice([0, 1, 2])
         else:
-            depth = depth // self.difficulty
-            # Winnable: 2.1,2.5,3,4 (two empty) 5 (Too easy) | Un-Winnable: 2
-            depth = math.ceil(depth)
-            x, y, _ = await self.minimax(self.board, depth, COMP)
+            # 1 always plays the best move, higher difficulties are
+            # easier as they play worse moves more often
+            cell = book.pick_move(
+                self.player_two_mask, self.player_one_mask, self.difficulty
+            )
+            x, y = divmod(cell, 3)
 
         await self.make_move(x + 1, y + 1)
 
     async def evaluate(self, board):
-        if await self.wins(board, COMP):
+        human, comp = self.to_masks(board)
+        if bitboard.WINNING[comp]:
             score = +1
-        elif await self.wins(board, HUMAN):
+        elif bitboard.WINNING[human]:
             score = -1
         else:
             score = 0
@@ -61,58 +117,29 @@ class TicTacToe:
         self.is_player_one_move = not self.is_player_one_move
 
     async def has_actual_winner(self, board):
-        winner = await self.has_winner(board=board)
-        return True if winner in [Winner.PLAYER_ONE, Winner.PLAYER_TWO] else False
+        human, comp = self.to_masks(board)
+        return bitboard.WINNING[human] or bitboard.WINNING[comp]
 
     async def has_winner(self, board=None) -> Winner:
         """
         Checks if the game has a winner,
         if so return who
         """
-        board = board or self.board
-        for row in board:
-            if all(x == row[0] for x in row) and row[0] != Piece.NULL:
-                return Winner.from_piece(row[0])
-
-        for i in range(3):
-            iter_rows = [board[0][i], board[1][i], board[2][i]]
-            if all(x == iter_rows[0] for x in iter_rows) and iter_rows[0] != Piece.NULL:
-                return Winner.from_piece(iter_rows[0])
-
-        right_way_diag = [board[0][0], board[1][1], board[2][2]]
-        if (
-            all(x == right_way_diag[0] for x in right_way_diag)
-            and right_way_diag[0] != Piece.NULL
-        ):
-            return Winner.from_piece(right_way_diag[0])
-
-        left_way_diag = [board[0][2], board[1][1], board[2][0]]
-        if (
-            all(x == left_way_diag[0] for x in left_way_diag)
-            and left_way_diag[0] != Piece.NULL
-        ):
-            return Winner.from_piece(left_way_diag[0])
-
-        return Winner.NO_WINNER
+        return self._winner(*self._masks(board))
 
     async def is_board_full(self, board=None) -> bool:
         """
         Checks if the board has any empty spaces left
         """
-        board = board or self.board
-        for row in range(3):
-            for column in range(3):
-                if board[row][column] == Piece.NULL:
-                    return False
-
-        return True
+        player_one_mask, player_two_mask = self._masks(board)
+        return player_one_mask | player_two_mask == bitboard.FULL_BOARD
 
     async def is_over(self):
-        is_board_full = await self.is_board_full()
-        has_winner = await self.has_winner()
-        winner = has_winner
-
-        if is_board_full and has_winner == Winner.NO_WINNER:
+        winner = self._winner(self.player_one_mask, self.player_two_mask)
+        if (
+            winner == Winner.NO_WINNER
+            and self.player_one_mask | self.player_two_mask == bitboard.FULL_BOARD
+        ):
             winner = Winner.DRAW
 
         return winner
@@ -120,56 +147,33 @@ class TicTacToe:
     async def make_move(self, row, column) -> None:
         row = int(row)
         column = int(column)
-        if 0 >= row <= 4 or 0 >= column <= 4:
+        if not 1 <= row <= 3 or not 1 <= column <= 3:
             raise InvalidMove
 
-        row -= 1
-        column -= 1
-
-        if self.board[row][column] != Piece.NULL:
+        cell = 1 << (row - 1) * 3 + column - 1
+        if (self.player_one_mask | self.player_two_mask) & cell:
             # Can't overwrite moves
             raise InvalidMove
 
-        self.board[row][column] = (
-            Piece.PLAYER_ONE if self.is_player_one_move else Piece.PLAYER_TWO
-        )
+        if self.is_player_one_move:
+            self.player_one_mask |= cell
+        else:
+            self.player_two_mask |= cell
+
         await self.flip_player()
 
     async def minimax(self, state, depth, player):
-        if player == COMP:
-            best = [-1, -1, -infinity]  # X, Y, Score
-        else:
-            best = [-1, -1, +infinity]
-
-        if depth == 0 or await self.has_actual_winner(state):
-            score = await self.evaluate(state)
+        human, comp = self.to_masks(state)
+        cell, score = bitboard.search(comp, human, depth, player == COMP)
+        if cell == -1:
             return [-1, -1, score]
 
-        for cell in await self.valid_moves(state):
-            x, y = cell[0], cell[1]
-            state[x][y] = player
-            score = await self.minimax(state, depth - 1, player.flip())
-            state[x][y] = Piece.NULL
-            score[0], score[1] = x, y
-
-            if player == COMP:
-                if score[2] > best[2]:
-                    best = score  # max value
-            else:
-                if score[2] < best[2]:
-                    best = score  # min value
-
-        return best
+        return [cell // 3, cell % 3, score]
 
     async def valid_moves(self, board=None):
-        board = board or self.board
-        valid_moves = []
-        for row_index, row in enumerate(board):
-            for column_index, column in enumerate(row):
-                if column == Piece.NULL:
-                    valid_moves.append([row_index, column_index])
-
-        return valid_moves
+        player_one_mask, player_two_mask = self._masks(board)
+        empty = bitboard.FULL_BOARD & ~(player_one_mask | player_two_mask)
+        return [[cell // 3, cell % 3] for cell in bitboard.CELLS[empty]]
 
     async def wins(self, board, player):
         winner = await self.has_winner(board)
@@ -0,0 +1,72 @@
+import functools
+import re
+from typing import Optional
+
+from bot_base.exceptions import NonExistentEntry
+
+from pyro.db import GuildConfigs
+from pyro.utils.caches import LRUCache
+
+
+@functools.lru_cache(maxsize=256)
+def compile_prefix(prefix: str) -> re.Pattern:
+    """Compile a pattern matching the given prefix,
+    case insensitively, followed by the word after it."""
+    return re.compile(re.escape(prefix) + r"(\S+)", flags=re.IGNORECASE)
+
+
+class GuildPrefixes:
+    """Caches each guild's prefix, so that messages can
+    be matched against it without awaiting anything.
+
+    Parameters
+    ----------
+    guild_configs: GuildConfigs
+        Where guild prefixes are stored.
+    default: str
+        The prefix for guilds without one set, and DM's.
+    """
+
+    def __init__(self, guild_configs: GuildConfigs, default: str):
+        self.guild_configs: GuildConfigs = guild_configs
+        self.default: str = default
+
+        # Keyed by guild id, or None for DM's
+        self._prefixes: LRUCache = LRUCache(1024)
+        self.guild_configs.add_listener(self.invalidate)
+
+    def cached(self, guild_id: Optional[int]) -> Optional[str]:
+        """Get a guild's prefix if it is already known."""
+        try:
+            return self._prefixes.get_entry(guild_id)
+        except NonExistentEntry:
+            return None
+
+    async def get(self, guild_id: Optional[int]) -> str:
+        """Get a guild's prefix."""
+        prefix = self.cached(guild_id)
+        if prefix is not None:
+            return prefix
+
+        prefix = self.default
+        if guild_id is not None:
+            config = await self.guild_configs.get(guild_id)
+            if config and config.get("prefix"):
+                prefix = config["prefix"]
+
+        self._prefixes.add_entry(guild_id, prefix, override=True)
+        return prefix
+
+    def invalidate(self, guild_id: Optional[int]) -> None:
+        """Forget a guild's prefix, such as after it changes."""
+        self._prefixes.delete_entry(guild_id)
+
+    @staticmethod
+    def match(prefix: str, content: str) -> Optional[str]:
+        """Get the word straight after the prefix,
+        if the content starts with the prefix."""
+        match = compile_prefix(prefix).match(content)
+        if match:
+            return match.group(1)
+
+        return None
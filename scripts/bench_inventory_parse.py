@@ -0,0 +1,184 @@
+# Benchmarks parsing objects.inv files against the previous BytesIO
+# reader and regex parser, checking both give the same entries.
+#
+# Usage: python scripts/bench_inventory_parse.py path/to/objects.inv [...]
+# Inventories can be downloaded from, for example,
+# https://docs.python.org/3/objects.inv
+import gc
+import io
+import os
+import re
+import sys
+import time
+import tracemalloc
+import zlib
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from cogs.docs import Docs, SphinxObjectFileReader  # noqa: E402
+
+URL = "https://example.com"
+
+
+class ReferenceReader:
+    # The reader as it was before it was rewritten around a cursor
+    BUFSIZE = 16 * 1024
+
+    def __init__(self, buffer):
+        self.stream = io.BytesIO(buffer)
+
+    def readline(self):
+        return self.stream.readline().decode("utf-8")
+
+    def read_compressed_chunks(self):
+        decompressor = zlib.decompressobj()
+        while True:
+            chunk = self.stream.read(self.BUFSIZE)
+            if len(chunk) == 0:
+                break
+            yield decompressor.decompress(chunk)
+        yield decompressor.flush()
+
+    def read_compressed_lines(self):
+        buf = b""
+        for chunk in self.read_compressed_chunks():
+            buf += chunk
+            pos = buf.find(b"\n")
+            while pos != -1:
+                yield buf[:pos].decode("utf-8")
+                buf = buf[pos + 1 :]
+                pos = buf.find(b"\n")
+
+
+def reference_parse(raw, url):
+    # The parser as it was before it built an Inventory
+    stream = ReferenceReader(raw)
+    result = {}
+    if stream.readline().rstrip() != "# Sphinx inventory version 2":
+        raise RuntimeError("Invalid objects.inv file version.")
+
+    stream.readline()
+    stream.readline()
+    if "zlib" not in stream.readline():
+        raise RuntimeError("Invalid objects.inv file, not z-lib compatible.")
+
+    entry_regex = re.compile(r"(?x)(.+?)\s+(\S*:\S*)\s+(-?\d+)\s+(\S+)\s+(.*)")
+    for line in stream.read_compressed_lines():
+        match = entry_regex.match(line.rstrip())
+        if not match:
+            continue
+
+        name, directive, prio, location, dispname = match.groups()
+        domain, _, subdirective = directive.partition(":")
+        if directive == "py:module" and name in result:
+            continue
+
+        if directive == "std:doc":
+            subdirective = "label"
+
+        if location.endswith("$"):
+            location = location[:-1] + name
+
+        key = name if dispname == "-" else dispname
+        prefix = f"{subdirective}:" if domain == "std" else ""
+        result[f"{prefix}{key}"] = os.path.join(url, location)
+
+    return result
+
+
+def parse(raw, url):
+    return Docs.parse_object_inv(None, SphinxObjectFileReader(raw), url)
+
+
+def make_inventory(lines):
+    header = (
+        b"# Sphinx inventory version 2\n# Project: X\n# Version: 1\n"
+        b"# The remainder of this file is compressed using zlib.\n"
+    )
+    return header + zlib.compress("\n".join(lines).encode() + b"\n")
+
+
+# Lines the fast path has to hand back to the regex, or handle specially
+EDGE_CASES = [
+    "foo py:function 1 lib/foo.html#$ -",
+    "foo bar std:label -1 x.html#$ Foo Bar",
+    "  lead py:data 0 a.html#$ -",
+    "mod py:module 0 m.html#module-$ -",
+    "mod py:module 0 WRONG.html -",
+    "dup py:class 1 one.html#$ -",
+    "dup py:class 1 two.html#$ -",
+    "badprio py:data --5 a.html -",
+    "nodisp py:data 1 a.html",
+    "tab\tpy:data 1 t.html#$ -",
+    "doc std:doc -1 page.html Page Title",
+    "unicode py:data 1 ü.html#$ Ünï",
+    "weird:name x:y 2 l.html -",
+    "trail py:data 1 t.html -   ",
+    "last py:data 1 last.html -",
+]
+
+
+def check(raw, url):
+    expected = reference_parse(raw, url)
+    inventory = parse(raw, url)
+    assert inventory.names == sorted(expected), "names differ"
+    assert all(inventory.get(name) == expected[name] for name in expected)
+    return len(expected)
+
+
+def best_of(func, repeat=5):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+
+    return best * 1000
+
+
+def retained(func):
+    # Only what the result keeps alive, not the peak while parsing
+    gc.collect()
+    tracemalloc.start()
+    result = func()
+    gc.collect()
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del result
+    return size / 2**20
+
+
+def main(paths):
+    print(f"edge cases: {check(make_inventory(EDGE_CASES), URL)} entries match")
+
+    for path in paths:
+        with open(path, "rb") as f:
+            raw = f.read()
+
+        count = check(raw, URL)
+        print(
+            f"{path}: {count} entries | "
+            f"old {best_of(lambda: reference_parse(raw, URL)):.0f}ms "
+            f"{retained(lambda: reference_parse(raw, URL)):.1f}MiB | "
+            f"new {best_of(lambda: parse(raw, URL)):.0f}ms "
+            f"{retained(lambda: parse(raw, URL)):.1f}MiB"
+        )
+
+    # Only splitting lines, where the old buffer slicing was quadratic
+    raw = make_inventory(f"x{i} py:data 1 a.html#$ -" for i in range(300_000))
+    for label, reader in (("old", ReferenceReader), ("new", SphinxObjectFileReader)):
+
+        def split():
+            stream = reader(raw)
+            for _ in range(4):
+                stream.readline()
+            return sum(1 for _ in stream.read_compressed_lines())
+
+        print(f"{label} split 300000 lines in {best_of(split, 1):.0f}ms")
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2:
+        sys.exit("Usage: python scripts/bench_inventory_parse.py objects.inv [...]")
+
+    main(sys.argv[1:])
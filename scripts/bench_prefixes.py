@@ -0,0 +1,76 @@
+# Benchmarks matching messages against a guild's prefix in
+# Tags.on_message, comparing bot_base's prefix lookup and replace
+# with GuildPrefixes once the guild's prefix is cached.
+#
+# Usage: python scripts/bench_prefixes.py [iterations]
+import asyncio
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bot_base import BotBase  # noqa: E402
+from bot_base.caches import TimedCache  # noqa: E402
+
+from pyro.utils import GuildPrefixes  # noqa: E402
+
+GUILD_ID = 1
+PREFIX = "py."
+MESSAGES = [
+    "hey does anyone know why my bot isn't responding to commands, "
+    "i've tried everything and it still doesn't work, any ideas at all? " * 2,
+    "py.tag something",
+    "PY.foo",
+]
+
+
+class GuildConfigs:
+    # Stands in for pyro.db.GuildConfigs without needing Mongo
+    async def get(self, guild_id):
+        return {"prefix": PREFIX}
+
+    def add_listener(self, listener):
+        pass
+
+
+async def main(iterations):
+    # How bot_base's get_guild_prefix finds a cached prefix
+    prefix_cache = TimedCache()
+    prefix_cache.add_entry(GUILD_ID, PREFIX)
+
+    async def get_guild_prefix(guild_id):
+        if guild_id in prefix_cache:
+            return prefix_cache.get_entry(guild_id)
+
+    prefixes = GuildPrefixes(GuildConfigs(), "!")
+    await prefixes.get(GUILD_ID)
+
+    for content in MESSAGES:
+
+        async def old():
+            for _ in range(iterations):
+                prefix = await get_guild_prefix(GUILD_ID)
+                prefix = BotBase.get_case_insensitive_prefix(content, prefix)
+                if content.startswith(prefix):
+                    content.replace(prefix, "").split(" ")[0]
+
+        async def new():
+            for _ in range(iterations):
+                prefix = prefixes.cached(GUILD_ID)
+                if prefix is None:
+                    prefix = await prefixes.get(GUILD_ID)
+
+                prefixes.match(prefix, content)
+
+        results = []
+        for func in (old, new):
+            start = time.perf_counter()
+            await func()
+            results.append((time.perf_counter() - start) / iterations * 1e9)
+
+        print(f"{content[:24]!r:<28} old {results[0]:.0f}ns | new {results[1]:.0f}ns")
+
+
+if __name__ == "__main__":
+    asyncio.run(main(int(sys.argv[1]) if len(sys.argv) > 1 else 200_000))
@@ -0,0 +1,107 @@
+# Benchmarks rtfm lookups with FuzzyIndex against the linear regex
+# scan Docs.finder does, checking both rank every query the same.
+#
+# Usage: python scripts/bench_rtfm_search.py path/to/objects.inv [...]
+# Inventories can be downloaded from, for example,
+# https://docs.python.org/3/objects.inv
+import heapq
+import os
+import random
+import re
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from cogs.docs import Docs, SphinxObjectFileReader  # noqa: E402
+from pyro.utils import FuzzyIndex  # noqa: E402
+
+QUERIES = 500
+LIMIT = 8
+
+
+def scan(names, text):
+    # The same ranking as Docs.finder, only keeping the top results
+    pattern = re.compile(".*?".join(map(re.escape, text)), flags=re.IGNORECASE)
+    scored = []
+    for name in names:
+        match = pattern.search(name)
+        if match:
+            scored.append((len(match.group()), match.start(), name))
+
+    return [name for _, _, name in heapq.nsmallest(LIMIT, scored)]
+
+
+def make_queries(names, seed=0):
+    rng = random.Random(seed)
+    substrings, subsequences = [], []
+    while len(substrings) < QUERIES:
+        name = rng.choice(names)
+        start = rng.randrange(len(name))
+        substrings.append(name[start : start + rng.randint(1, 12)])
+
+    while len(subsequences) < QUERIES:
+        name = rng.choice(names)
+        query = "".join(char for char in name if rng.random() < 0.3)
+        if query:
+            subsequences.append(query)
+
+    return {"substring": substrings, "subsequence": subsequences}
+
+
+def timed(func, query, repeat=3):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func(query)
+        best = min(best, time.perf_counter() - start)
+
+    return best * 1000
+
+
+def percentiles(times):
+    times = sorted(times)
+    return " ".join(
+        f"p{p} {times[min(len(times) - 1, len(times) * p // 100)]:.3f}ms"
+        for p in (50, 90, 99)
+    )
+
+
+def main(paths):
+    for path in paths:
+        with open(path, "rb") as f:
+            inventory = Docs.parse_object_inv(
+                None, SphinxObjectFileReader(f.read()), "https://example.com"
+            )
+
+        names = inventory.names
+        start = time.perf_counter()
+        index = FuzzyIndex(names, limit=LIMIT)
+        print(
+            f"{path}: {len(names)} names, "
+            f"index built in {time.perf_counter() - start:.2f}s"
+        )
+
+        for kind, queries in make_queries(names).items():
+            mismatches = 0
+            scan_times, index_times = [], []
+            for query in queries:
+                start = time.perf_counter()
+                expected = scan(names, query)
+                scan_times.append((time.perf_counter() - start) * 1000)
+
+                index_times.append(timed(index.search, query))
+                mismatches += index.search(query) != expected
+
+            print(
+                f"  {kind:<11} scan {statistics.median(scan_times):.1f}ms median | "
+                f"index {percentiles(index_times)} | {mismatches} mismatches"
+            )
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2:
+        sys.exit("Usage: python scripts/bench_rtfm_search.py objects.inv [...]")
+
+    main(sys.argv[1:])
@@ -0,0 +1,127 @@
+# Benchmarks the computer's TicTacToe search, comparing the memoized
+# bitboard.search against a copy of the async list based minimax it
+# replaced, checking both pick the same move with the same score.
+#
+# Usage: python scripts/bench_tictactoe.py
+import asyncio
+import math
+import os
+import sys
+import time
+from math import inf as infinity
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from pyro.utils.enums import Piece, Winner  # noqa: E402
+from pyro.utils.games.tictactoe import bitboard  # noqa: E402
+
+HUMAN = Piece.PLAYER_ONE
+COMP = Piece.PLAYER_TWO
+
+# The cells each side has played, 0 to 8, and the difficulty
+POSITIONS = [
+    ((0,), (), 1),
+    ((4,), (), 1),
+    ((0,), (), 2.5),
+    ((0,), (8,), 1),
+    ((0, 8), (1,), 1),
+]
+
+
+class ReferenceEngine:
+    # The search as it was before it moved onto bitboards
+
+    async def has_winner(self, board) -> Winner:
+        lines = [*board, *zip(*board)]
+        lines.append([board[0][0], board[1][1], board[2][2]])
+        lines.append([board[0][2], board[1][1], board[2][0]])
+        for line in lines:
+            if all(x == line[0] for x in line) and line[0] != Piece.NULL:
+                return Winner.from_piece(line[0])
+
+        return Winner.NO_WINNER
+
+    async def has_actual_winner(self, board):
+        winner = await self.has_winner(board)
+        return winner in [Winner.PLAYER_ONE, Winner.PLAYER_TWO]
+
+    async def evaluate(self, board):
+        winner = await self.has_winner(board)
+        if winner == Winner.from_piece(COMP):
+            return +1
+        elif winner == Winner.from_piece(HUMAN):
+            return -1
+
+        return 0
+
+    async def valid_moves(self, board):
+        return [
+            [row_index, column_index]
+            for row_index, row in enumerate(board)
+            for column_index, column in enumerate(row)
+            if column == Piece.NULL
+        ]
+
+    async def minimax(self, state, depth, player):
+        if player == COMP:
+            best = [-1, -1, -infinity]
+        else:
+            best = [-1, -1, +infinity]
+
+        if depth == 0 or await self.has_actual_winner(state):
+            return [-1, -1, await self.evaluate(state)]
+
+        for x, y in await self.valid_moves(state):
+            state[x][y] = player
+            score = await self.minimax(state, depth - 1, player.flip())
+            state[x][y] = Piece.NULL
+            score[0], score[1] = x, y
+
+            if player == COMP:
+                if score[2] > best[2]:
+                    best = score
+            else:
+                if score[2] < best[2]:
+                    best = score
+
+        return best
+
+
+async def main():
+    engine = ReferenceEngine()
+    for human_cells, comp_cells, difficulty in POSITIONS:
+        board = [[Piece.NULL for _ in range(3)] for _ in range(3)]
+        human = comp = 0
+        for cell in human_cells:
+            board[cell // 3][cell % 3] = HUMAN
+            human |= 1 << cell
+        for cell in comp_cells:
+            board[cell // 3][cell % 3] = COMP
+            comp |= 1 << cell
+
+        # The same depth maths as TicTacToe.ai_turn always used
+        depth = math.ceil((9 - len(human_cells) - len(comp_cells)) // difficulty)
+
+        start = time.perf_counter()
+        x, y, old_score = await engine.minimax(board, depth, COMP)
+        old = time.perf_counter() - start
+
+        bitboard.search.cache_clear()
+        start = time.perf_counter()
+        bitboard.search(comp, human, depth, True)
+        cold = time.perf_counter() - start
+
+        start = time.perf_counter()
+        cell, score = bitboard.search(comp, human, depth, True)
+        warm = time.perf_counter() - start
+
+        assert (cell, score) == (x * 3 + y, old_score), "moves differ"
+        print(
+            f"human {human_cells} computer {comp_cells}, difficulty {difficulty}: "
+            f"old {old * 1e3:.1f}ms | new cold {cold * 1e3:.2f}ms, "
+            f"warm {warm * 1e6:.1f}us"
+        )
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,145 @@
+# These need a running mongod, set TEST_MONGO to use one
+# other than the default local instance
+import asyncio
+import datetime
+import os
+
+import pytest
+import pytest_asyncio
+from alaric import Document
+from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo.errors import ServerSelectionTimeoutError
+
+from pyro.db import Tag, TagSync
+
+POLL_INTERVAL = 0.1
+
+
+def tag_data(name: str) -> dict:
+    return {
+        "name": name,
+        "content": f"{name} content",
+        "creator_id": 1,
+        "description": f"{name} description",
+        "category": "Python",
+    }
+
+
+@pytest_asyncio.fixture
+async def tags():
+    client = AsyncIOMotorClient(
+        os.environ.get("TEST_MONGO", "mongodb://localhost:27017"),
+        serverSelectionTimeoutMS=1000,
+    )
+    try:
+        await client.admin.command("ping")
+    except ServerSelectionTimeoutError:
+        pytest.skip("No mongod to test against")
+
+    database = client["pyro_test_tag_sync"]
+    await database.drop_collection("tags")
+    yield Document(database, "tags", converter=Tag)
+
+    await client.drop_database(database)
+    client.close()
+
+
+def start_polling(tags: Document, updated: list, deleted: list) -> asyncio.Task:
+    sync = TagSync(tags, updated.append, deleted.append, poll_interval=POLL_INTERVAL)
+    return asyncio.create_task(sync.poll())
+
+
+async def settle():
+    await asyncio.sleep(POLL_INTERVAL * 4)
+
+
+async def write(tags: Document, name: str) -> None:
+    # As Tags.save_tag does
+    await tags.raw_collection.update_one(
+        {"name": name},
+        {"$set": tag_data(name), "$currentDate": {"updated_at": True}},
+        upsert=True,
+    )
+
+
+@pytest.mark.asyncio
+async def test_untimestamped_tags_are_not_refetched(tags):
+    await tags.raw_collection.insert_one(tag_data("legacy"))
+
+    updated = []
+    task = start_polling(tags, updated, [])
+    await settle()
+    task.cancel()
+
+    assert updated == []
+
+
+@pytest.mark.asyncio
+async def test_changed_tags_are_applied_once(tags):
+    updated = []
+    task = start_polling(tags, updated, [])
+    await settle()
+
+    await write(tags, "first")
+    await settle()
+    await write(tags, "second")
+    await write(tags, "first")
+    await settle()
+    task.cancel()
+
+    assert sorted(tag.name for tag in updated) == ["first", "first", "second"]
+    assert all(tag.updated_at for tag in updated)
+
+
+@pytest.mark.asyncio
+async def test_deleted_tags_are_forgotten(tags):
+    result = await tags.raw_collection.insert_one(tag_data("doomed"))
+
+    deleted = []
+    task = start_polling(tags, [], deleted)
+    await settle()
+    await tags.raw_collection.delete_one({"_id": result.inserted_id})
+    await settle()
+    task.cancel()
+
+    assert deleted == [result.inserted_id]
+
+
+@pytest.mark.asyncio
+async def test_tags_written_in_the_same_millisecond_are_applied(tags):
+    updated = []
+    task = start_polling(tags, updated, [])
+    await settle()
+
+    # Stamped by hand, so both land on the same millisecond
+    stamp = datetime.datetime(2100, 1, 1)
+    await tags.raw_collection.insert_one({**tag_data("first"), "updated_at": stamp})
+    await settle()
+    await tags.raw_collection.insert_one({**tag_data("second"), "updated_at": stamp})
+    await settle()
+    task.cancel()
+
+    assert [tag.name for tag in updated] == ["first", "second"]
+
+
+@pytest.mark.asyncio
+async def test_unreadable_tags_are_skipped(tags):
+    updated = []
+    task = start_polling(tags, updated, [])
+    await settle()
+
+    # Written first, as the broken tag's stamp is far later
+    await write(tags, "working")
+    await tags.raw_collection.insert_one(
+        {
+            **tag_data("broken"),
+            "unknown_field": True,
+            "updated_at": datetime.datetime(2100, 1, 1),
+        }
+    )
+    await settle()
+
+    assert not task.done()
+    task.cancel()
+
+    assert [tag.name for tag in updated] == ["working"]
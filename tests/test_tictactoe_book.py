@@ -0,0 +1,79 @@
+import pytest
+
+from pyro.utils.games.tictactoe import bitboard, book
+
+
+def reachable_positions():
+    """Every reachable unfinished board with the computer to move,
+    whichever player went first."""
+    positions = []
+    seen = set()
+    stack = [(0, 0, True), (0, 0, False)]
+    while stack:
+        comp, human, comp_to_move = stack.pop()
+        if (comp, human, comp_to_move) in seen:
+            continue
+
+        seen.add((comp, human, comp_to_move))
+        if bitboard.WINNING[comp] or bitboard.WINNING[human]:
+            continue
+
+        cells = bitboard.CELLS[bitboard.FULL_BOARD & ~(comp | human)]
+        if not cells:
+            continue
+
+        if comp_to_move:
+            positions.append((comp, human))
+
+        for cell in cells:
+            if comp_to_move:
+                stack.append((comp | 1 << cell, human, False))
+            else:
+                stack.append((comp, human | 1 << cell, True))
+
+    return positions
+
+
+POSITIONS = reachable_positions()
+
+
+def empty_cells(comp, human):
+    return bitboard.CELLS[bitboard.FULL_BOARD & ~(comp | human)]
+
+
+def test_every_position_is_covered():
+    # 4520 boards, as the computer moves second or first
+    assert len(POSITIONS) == len(set(POSITIONS)) == 4520
+    for comp, human in POSITIONS:
+        key, _ = book.canonical(comp, human)
+        assert key in book.BOOK
+
+
+def test_best_move_matches_search():
+    for comp, human in POSITIONS:
+        depth = len(empty_cells(comp, human))
+        expected = bitboard.search(comp, human, depth, True)
+
+        assert book.ranked_moves(comp, human)[0] == expected
+        assert book.pick_move(comp, human, 1) == expected[0]
+
+
+def test_every_move_is_scored_as_search_would():
+    for comp, human in POSITIONS:
+        cells = empty_cells(comp, human)
+        moves = book.ranked_moves(comp, human)
+
+        assert sorted(cell for cell, _ in moves) == list(cells)
+        for cell, score in moves:
+            _, expected = bitboard.search(
+                comp | 1 << cell, human, len(cells) - 1, False
+            )
+            assert score == expected
+
+
+@pytest.mark.parametrize("difficulty", [1.5, 2.5, 10])
+def test_easier_difficulties_only_play_legal_moves(difficulty):
+    for comp, human in POSITIONS[::50]:
+        cells = empty_cells(comp, human)
+        for _ in range(10):
+            assert book.pick_move(comp, human, difficulty) in cells